@@ -0,0 +1,4 @@
+"""DailyFlow+ core: habit data, storage and reports, importable without Tk.
+
+The desktop app lives in main.py; `python -m dailyflow` is the command-line entry.
+"""
@@ -0,0 +1,8 @@
+import sys
+import time
+
+T_START = time.perf_counter()   # before the package imports, so --time covers them too
+
+from .cli import main
+
+sys.exit(main(t_start=T_START))
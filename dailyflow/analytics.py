@@ -0,0 +1,354 @@
+"""Analytics over the compact histories: cross-habit co-occurrence and per-habit statistics.
+
+Every habit contributes FEATURES columns per day (done + one per built-in
+mood); the co-occurrence matrix is the Gram matrix X^T X of that 0/1 day ×
+column table over a date window. Pairs, phi correlations and "B's mood when
+A is skipped" all come from its entries. NumPy builds it in one matrix
+product when installed; otherwise a pure-Python loop over each day's set
+columns does the same. A mark or clear shifts one day's row, so the cached
+matrix is patched in O(set columns) instead of rebuilt.
+
+Per-habit statistics (distribution, rolling rates, streak histogram,
+weekday breakdown) follow the same pattern, see the section below.
+"""
+
+from datetime import date, timedelta
+from math import sqrt
+
+from . import core, storage
+from .model import MOOD_OPTIONS
+
+FEATURES = ("done",) + tuple(k for k, _ in MOOD_OPTIONS)
+NF = len(FEATURES)
+CORR_DEFAULT_DAYS = 90
+
+# NumPy is optional and only imported on the first vectorized call, so the CLI
+# and the GUI do not pay ~100 ms for it at startup.
+np = None
+_NUMPY = {"tried": False}
+
+def load_numpy():
+    """The numpy module, imported on first use; None if it is not installed."""
+    global np
+    if not _NUMPY["tried"]:
+        _NUMPY["tried"] = True
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np = numpy
+    return np
+
+
+def _feature_cols(done, code):
+    """Columns (within one habit's block) set by a day's (done, mood code)."""
+    cols = [0] if done else []
+    if 0 < code < NF:
+        cols.append(code)
+    return cols
+
+class CoMatrix:
+    """Co-occurrence counts for `names` over the days [s, e]."""
+
+    def __init__(self, names, s, e, use_numpy=None):
+        self.names = list(names)
+        self.index = {n: i for i, n in enumerate(self.names)}
+        self.s, self.e = s, e
+        self.n_days = (e - s).days + 1
+        self.numpy = use_numpy is not False and load_numpy() is not None
+        self.g = self._build_numpy() if self.numpy else self._build_python()
+
+    # ---- build ----
+    def _habit_days(self):
+        return [core.get_habit(n)["days"] for n in self.names]
+
+    def _build_numpy(self):
+        lo, n = self.s.toordinal(), self.n_days
+        x = np.zeros((n, len(self.names) * NF), dtype=np.int32)
+        for hi, days in enumerate(self._habit_days()):
+            a, b = max(lo, days.start), min(lo + n, days.start + len(days.moods))
+            if a >= b:
+                continue
+            moods = np.frombuffer(days.moods, dtype=np.uint8)[a - days.start:b - days.start]
+            bits = np.unpackbits(np.frombuffer(bytes(days.bits), dtype=np.uint8), bitorder="little")
+            rows = slice(a - lo, b - lo)
+            x[rows, hi * NF] = bits[a - days.start:b - days.start]
+            for k in range(1, NF):
+                x[rows, hi * NF + k] = moods == k
+        return x.T @ x
+
+    def _build_python(self):
+        lo, n = self.s.toordinal(), self.n_days
+        per_day = [[] for _ in range(n)]
+        for hi, days in enumerate(self._habit_days()):
+            a, b = max(lo, days.start), min(lo + n, days.start + len(days.moods))
+            for o in range(a, b):
+                for c in _feature_cols(*days.state(o)):
+                    per_day[o - lo].append(hi * NF + c)
+        size = len(self.names) * NF
+        g = [[0] * size for _ in range(size)]
+        for cols in per_day:
+            for i in cols:
+                gi = g[i]
+                for j in cols:
+                    gi[j] += 1
+        return g
+
+    # ---- incremental update ----
+    def _row_cols(self, o, skip=None):
+        """Set columns of day `o` for every habit except `skip`."""
+        cols = []
+        for hi, n in enumerate(self.names):
+            if hi != skip:
+                cols.extend(hi * NF + c for c in _feature_cols(*core.DATA["habits"][n]["days"].state(o)))
+        return cols
+
+    def update(self, name, o, old, new):
+        """Patch the matrix after day `o` of `name` changed from old to new (done, code)."""
+        if not self.s.toordinal() <= o <= self.e.toordinal() or old == new:
+            return
+        hi = self.index[name]
+        rest = self._row_cols(o, skip=hi)
+        before = [hi * NF + c for c in _feature_cols(*old)]
+        after = [hi * NF + c for c in _feature_cols(*new)]
+        g = self.g
+        # G += x_new x_new^T - x_old x_old^T, where the row differs only in this habit's block
+        for cols, sign in ((before, -1), (after, 1)):
+            for i in cols:
+                for j in rest:
+                    g[i][j] += sign
+                    g[j][i] += sign
+                for j in cols:
+                    g[i][j] += sign
+
+    # ---- queries ----
+    def count(self, a, fa, b, fb):
+        """Days in the window where feature fa holds for habit a and fb for habit b."""
+        return int(self.g[self.index[a] * NF + FEATURES.index(fa)][self.index[b] * NF + FEATURES.index(fb)])
+
+    def phi(self, a, b, feature="done"):
+        """Phi correlation (-1..1) of `feature` on habit a vs on habit b; None if either never/always holds."""
+        n = self.n_days
+        n11 = self.count(a, feature, b, feature)
+        na, nb = self.count(a, feature, a, feature), self.count(b, feature, b, feature)
+        den = na * (n - na) * nb * (n - nb)
+        if not den:
+            return None
+        return (n * n11 - na * nb) / sqrt(den)
+
+    def phi_matrix(self, feature="done"):
+        return [[self.phi(a, b, feature) for b in self.names] for a in self.names]
+
+    def mood_when(self, a, b, mood):
+        """(share of a's done days where b had `mood`, share of a's skipped days where it did)."""
+        n = self.n_days
+        a_done = self.count(a, "done", a, "done")
+        b_mood = self.count(b, mood, b, mood)
+        both = self.count(a, "done", b, mood)
+        on = both / a_done if a_done else None
+        off = (b_mood - both) / (n - a_done) if n - a_done else None
+        return on, off
+
+    def findings(self, mood, limit=8, min_days=5):
+        """Largest "when A is skipped, B is more/less often `mood`" gaps, as (a, b, off, on)."""
+        out = []
+        for a in self.names:
+            a_done = self.count(a, "done", a, "done")
+            if a_done < min_days or self.n_days - a_done < min_days:
+                continue
+            for b in self.names:
+                if a == b:
+                    continue
+                on, off = self.mood_when(a, b, mood)
+                if on is not None and off is not None:
+                    out.append((a, b, off, on))
+        out.sort(key=lambda t: -abs(t[2] - t[3]))
+        return out[:limit]
+
+# ------------- cached matrix -------------
+
+_CACHE = {"m": None}
+
+def _on_change(name, o, old, new):
+    m = _CACHE["m"]
+    if m is None:
+        return
+    if name is None or o is None or name not in m.index:
+        _CACHE["m"] = None      # habit added/removed or a bulk change: rebuild on next use
+    else:
+        m.update(name, o, old, new)
+
+core.CHANGE_HOOKS.append(_on_change)
+
+def co_matrix(s=None, e=None, names=None):
+    """The co-occurrence matrix for [s, e] (default: last CORR_DEFAULT_DAYS days) over `names`
+    (default: all habits), reused and kept current across marks while the window stays the same."""
+    e = e or date.today()
+    s = s or e - timedelta(days=CORR_DEFAULT_DAYS - 1)
+    names = list(names or core.list_habits())
+    m = _CACHE["m"]
+    if m is None or (m.s, m.e, m.names) != (s, e, names):
+        with storage.DATA_LOCK:
+            m = _CACHE["m"] = CoMatrix(names, s, e)
+    return m
+
+# ------------- per-habit statistics -------------
+# Each function has a NumPy path over dense per-habit arrays (built once and
+# cached, patched on marks) and a plain loop over the history as fallback;
+# `selfcheck()` runs both and compares. use_numpy=None means "if installed".
+
+_DENSE = {}     # name -> (start ordinal, done uint8 array, mood uint8 array)
+
+def _want_numpy(use_numpy):
+    return use_numpy is not False and load_numpy() is not None
+
+def _dense(name):
+    """Dense arrays for `name`'s whole stored history (cached)."""
+    hit = _DENSE.get(name)
+    if hit is None:
+        days = core.get_habit(name)["days"]
+        n = len(days.moods)
+        done = np.unpackbits(np.frombuffer(bytes(days.bits), dtype=np.uint8), bitorder="little")[:n]
+        mood = np.frombuffer(days.moods, dtype=np.uint8).copy()
+        hit = _DENSE[name] = (days.start, done, mood)
+    return hit
+
+def _window(name, s, e):
+    """Dense (done, mood) arrays for the days [s, e], zero-padded outside the history."""
+    start, done, mood = _dense(name)
+    lo, n = s.toordinal(), (e - s).days + 1
+    out_done = np.zeros(n, dtype=np.int64)
+    out_mood = np.zeros(n, dtype=np.uint8)
+    a, b = max(lo, start), min(lo + n, start + len(done))
+    if a < b:
+        out_done[a - lo:b - lo] = done[a - start:b - start]
+        out_mood[a - lo:b - lo] = mood[a - start:b - start]
+    return out_done, out_mood
+
+def _on_change_dense(name, o, old, new):
+    if name is None or o is None:
+        _DENSE.clear()
+        return
+    hit = _DENSE.get(name)
+    if hit is None:
+        return
+    start, done, mood = hit
+    if start <= o < start + len(done):
+        done[o - start], mood[o - start] = new     # O(1) patch
+    else:
+        del _DENSE[name]                            # history grew: rebuild on next use
+
+core.CHANGE_HOOKS.append(_on_change_dense)
+
+def _states(name, s, e):
+    """(done, mood code) per day in [s, e] for the loop fallback."""
+    days = core.get_habit(name)["days"]
+    return [days.state(o) for o in range(s.toordinal(), e.toordinal() + 1)]
+
+def distribution(name, s, e, use_numpy=None):
+    """{"done": completed days, mood: days with that mood ...} within [s, e]."""
+    if _want_numpy(use_numpy):
+        done, mood = _window(name, s, e)
+        counts = np.bincount(mood, minlength=NF)
+        out = {"done": int(done.sum())}
+        out.update({k: int(counts[i]) for i, k in enumerate(FEATURES) if i})
+        return out
+    out = dict.fromkeys(FEATURES, 0)
+    for d, m in _states(name, s, e):
+        if d:
+            out["done"] += 1
+        if 0 < m < NF:
+            out[FEATURES[m]] += 1
+    return out
+
+def rolling_rate(name, s, e, window, use_numpy=None, mood=None):
+    """Share of the `window` days ending on each day of [s, e] that were done
+    (or had `mood`), as a list of floats; a sliding sum, O(days) not O(days·window)."""
+    code = FEATURES.index(mood) if mood and mood != "done" else None
+    pre = s - timedelta(days=window - 1)
+    if _want_numpy(use_numpy):
+        done, m = _window(name, pre, e)
+        hit = done if code is None else (m == code).astype(np.int64)
+        cs = np.concatenate(([0], np.cumsum(hit)))
+        return ((cs[window:] - cs[:-window]) / window).tolist()
+    states = _states(name, pre, e)
+    hit = [d if code is None else int(m == code) for d, m in states]
+    out, run = [], sum(hit[:window - 1])
+    for i in range(window - 1, len(hit)):
+        run += hit[i]
+        out.append(run / window)
+        run -= hit[i - window + 1]
+    return out
+
+def streak_histogram(name, use_numpy=None):
+    """{run length: how many runs} over the whole history."""
+    days = core.get_habit(name)["days"]
+    if not days.marks:
+        return {}
+    if _want_numpy(use_numpy):
+        _, done, _ = _dense(name)
+        edges = np.diff(np.concatenate(([0], done.astype(np.int8), [0])))
+        lengths = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+        vals, cnt = np.unique(lengths, return_counts=True)
+        return {int(v): int(c) for v, c in zip(vals, cnt)}
+    hist, run, prev = {}, 0, None
+    for o in days.marks:
+        if prev is not None and o == prev + 1:
+            run += 1
+        else:
+            if run:
+                hist[run] = hist.get(run, 0) + 1
+            run = 1
+        prev = o
+    hist[run] = hist.get(run, 0) + 1
+    return dict(sorted(hist.items()))
+
+def weekday_breakdown(name, s, e, use_numpy=None):
+    """Per weekday Mon..Sun: {"days": days in range, "done": ..., mood: ...}."""
+    first = s.weekday()
+    if _want_numpy(use_numpy):
+        done, mood = _window(name, s, e)
+        wd = (np.arange(len(done)) + first) % 7
+        out = []
+        for k in range(7):
+            sel = wd == k
+            row = {"days": int(sel.sum()), "done": int(done[sel].sum())}
+            counts = np.bincount(mood[sel], minlength=NF)
+            row.update({f: int(counts[i]) for i, f in enumerate(FEATURES) if i})
+            out.append(row)
+        return out
+    out = [dict({"days": 0}, **dict.fromkeys(FEATURES, 0)) for _ in range(7)]
+    for i, (d, m) in enumerate(_states(name, s, e)):
+        row = out[(i + first) % 7]
+        row["days"] += 1
+        row["done"] += d
+        if 0 < m < NF:
+            row[FEATURES[m]] += 1
+    return out
+
+def selfcheck(names=None, s=None, e=None):
+    """Run every statistic with NumPy and with the loops and list the mismatches.
+
+    Returns (checks run, [mismatch descriptions]); without NumPy only the loops run.
+    """
+    names = list(names or core.list_habits())
+    checks, bad = 0, []
+    for name in names:
+        days = core.get_habit(name)["days"]
+        hs = days.first_day() or date.today()
+        he = max(days.last_day() or hs, date.today())
+        s1, e1 = s or hs - timedelta(days=3), e or he + timedelta(days=3)
+        cases = [
+            ("distribution", lambda u: distribution(name, s1, e1, u)),
+            ("streak_histogram", lambda u: streak_histogram(name, u)),
+            ("weekday_breakdown", lambda u: weekday_breakdown(name, s1, e1, u)),
+        ]
+        for w in (7, 30):
+            cases.append((f"rolling_rate/{w}", lambda u, w=w: rolling_rate(name, s1, e1, w, u)))
+            cases.append((f"rolling_rate/{w}/happy", lambda u, w=w: rolling_rate(name, s1, e1, w, u, "happy")))
+        for label, fn in cases:
+            ref = fn(False)
+            checks += 1
+            if load_numpy() is not None and fn(True) != ref:
+                bad.append(f"{name}: {label}")
+    return checks, bad
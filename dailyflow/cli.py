@@ -0,0 +1,218 @@
+"""Command-line entry: `python -m dailyflow <command>` (no Tk, no display needed).
+
+Examples:
+    python -m dailyflow list
+    python -m dailyflow report "Read Book" --range 30
+    python -m dailyflow export --range 01-10-2025:31-10-2025 --range 7 --out reports/
+    python -m dailyflow export --range 365 --out all.zip --workers 4
+    python -m dailyflow export "Read Book" --range 2000-01-01:2025-12-31 --format csv
+    python -m dailyflow import old_log.csv more.jsonl
+    python -m dailyflow corr --range 90 --feature stressed
+    python -m dailyflow stats "Read Book" --range 365
+    python -m dailyflow selfcheck
+    python -m dailyflow --backend sqlite migrate
+"""
+
+import argparse
+import calendar
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+from . import core, storage
+from .model import MOOD_ICON, fmt_date_obj, parse_date
+from .reports import EXPORT_FORMATS, report_filename, report_lines, write_lines
+
+# export (process pool, zipfile), importer and analytics are imported inside the
+# commands that use them, keeping them off the startup path
+
+
+def parse_range(spec):
+    """'N' = last N days incl. today; 'START:END' = dates in YYYY-MM-DD or DD-MM-YYYY."""
+    spec = spec.strip()
+    if spec.isdigit():
+        e = date.today()
+        return e - timedelta(days=max(1, int(spec)) - 1), e
+    a, sep, b = spec.partition(":")
+    s, e = parse_date(a), parse_date(b)
+    if not sep or s is None or e is None:
+        raise argparse.ArgumentTypeError(f"bad range {spec!r} (use N or START:END)")
+    if s > e:
+        raise argparse.ArgumentTypeError(f"bad range {spec!r}: start is after end")
+    return s, e
+
+def _pick_habits(names):
+    """Requested habits in the order given (all habits if none); unknown names are errors."""
+    have = core.list_habits()
+    if not names:
+        return have
+    missing = [n for n in names if n not in core.DATA["habits"]]
+    if missing:
+        sys.exit(f"dailyflow: unknown habit(s): {', '.join(missing)}")
+    return names
+
+def cmd_list(args):
+    today = date.today()
+    for name in core.list_habits():
+        h = core.habit_shell(name)
+        mood = h["days"].mood(today) if core.is_done(h, today) else None
+        print(f"{name}\tstreak {core.compute_streak(name)}\ttoday {MOOD_ICON.get(mood, '—')} {mood or '—'}")
+
+def _reports(args, build):
+    from .export import _unique_filename
+    out = 0
+    seen = set()
+    for name in _pick_habits(args.habits):
+        for s, e in args.ranges or [parse_range("7")]:
+            lines = build(name, s, e)
+            if args.out:
+                fname = _unique_filename(report_filename(name, s, e), seen)
+                write_lines(os.path.join(args.out, fname), lines)
+            else:
+                print("\n".join(lines) + "\n")
+            out += 1
+    return out
+
+def cmd_report(args):
+    n = _reports(args, report_lines)
+    if args.out:
+        print(f"{n} report(s) written to {args.out}")
+
+def cmd_export(args):
+    from .export import export_bulk, format_stats
+    out = args.out or "."
+    st = export_bulk(_pick_habits(args.habits), args.ranges or [parse_range("7")], out,
+                     args.workers, args.format)
+    print(format_stats(st, out))
+
+def cmd_import(args):
+    from .importer import IMPORT_BATCH, format_import_stats, import_file
+    imported, err = 0, None
+    for path in args.files:
+        try:
+            st = import_file(path, args.batch or IMPORT_BATCH, save=False)
+        except (OSError, ValueError) as ex:
+            err = f"dailyflow: {ex}"
+            break
+        imported += st["imported"]
+        print(format_import_stats(st, path))
+    if imported:
+        core.save_data()    # one save for all files
+    if err:
+        sys.exit(err)
+
+def cmd_corr(args):
+    from .analytics import co_matrix
+    s, e = args.range or (None, None)
+    m = co_matrix(s, e, _pick_habits(args.habits))
+    w = max([len(n) for n in m.names] + [6])
+    print(f"phi ({args.feature}) {fmt_date_obj(m.s)} to {fmt_date_obj(m.e)}"
+          f"{' [numpy]' if m.numpy else ''}")
+    print(" " * w + "".join(f"{i:>7}" for i in range(len(m.names))))
+    for i, a in enumerate(m.names):
+        cells = (m.phi(a, b, args.feature) for b in m.names)
+        print(f"{a:<{w}}" + "".join("      —" if r is None else f"{r:+7.2f}" for r in cells) + f"  [{i}]")
+    mood = args.feature if args.feature != "done" else "stressed"
+    for a, b, off, on in m.findings(mood):
+        print(f"{a} skipped → {b} {mood} {off:.0%} of days (vs {on:.0%} when done)")
+
+def cmd_stats(args):
+    from . import analytics
+    s, e = args.range or parse_range("365")
+    for name in _pick_habits(args.habits):
+        dist = analytics.distribution(name, s, e)
+        total = (e - s).days + 1
+        print(f"{name} — {fmt_date_obj(s)} to {fmt_date_obj(e)}")
+        print(f"  done {dist['done']}/{total}  " + "  ".join(f"{MOOD_ICON[k]} {dist[k]}" for k in MOOD_ICON))
+        for w in (7, 30):
+            done_rate = analytics.rolling_rate(name, e, e, w)[0]
+            happy_rate = analytics.rolling_rate(name, e, e, w, mood="happy")[0]
+            print(f"  last {w:>2} days: {done_rate:.0%} done, {happy_rate:.0%} happy")
+        hist = analytics.streak_histogram(name)
+        print("  streaks: " + (", ".join(f"{n}d×{c}" for n, c in hist.items()) or "—"))
+        wk = analytics.weekday_breakdown(name, s, e)
+        print("  weekdays: " + "  ".join(
+            f"{calendar.day_abbr[k]} {row['done']}/{row['days']}" for k, row in enumerate(wk)))
+
+def cmd_selfcheck(args):
+    from . import analytics
+    checks, bad = analytics.selfcheck(_pick_habits(args.habits))
+    if analytics.load_numpy() is None:
+        print(f"NumPy not installed: ran {checks} loop checks only")
+        return
+    for b in bad:
+        print(f"MISMATCH {b}")
+    print(f"{checks} checks, {len(bad)} mismatch(es) between NumPy and the loops")
+    if bad:
+        sys.exit(1)
+
+def cmd_migrate(args):
+    if os.path.exists(storage.DB_FILE):
+        sys.exit(f"dailyflow: {storage.DB_FILE} already exists")
+    n = storage.migrate_json_to_sqlite()
+    print(f"Migrated {storage.DATA_FILE} into {storage.DB_FILE} ({n} day rows)")
+
+def build_parser():
+    p = argparse.ArgumentParser(prog="dailyflow", description="DailyFlow+ habit & mood tracker (headless).")
+    p.add_argument("--dir", help="folder holding habits.json / habits.db (default: current folder)")
+    p.add_argument("--backend", choices=("json", "sqlite"), help="storage backend (default: %s)" % storage.STORAGE_BACKEND)
+    p.add_argument("--time", action="store_true", help="print import, load and run time to stderr")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="habits with streak and today's mood").set_defaults(func=cmd_list)
+    for name, func, help_text in (
+        ("report", cmd_report, "print reports (or write them with --out)"),
+        ("export", cmd_export, "write TXT/CSV/JSONL exports"),
+    ):
+        sp = sub.add_parser(name, help=help_text)
+        sp.add_argument("habits", nargs="*", help="habit names (default: all)")
+        sp.add_argument("--range", dest="ranges", action="append", type=parse_range, metavar="R",
+                        help="N (last N days) or START:END; repeatable (default: 7)")
+        sp.add_argument("--out", help="output folder" + (" or .zip file" if name == "export" else ""))
+        if name == "export":
+            sp.add_argument("--workers", type=int, metavar="N",
+                            help="worker processes (default: CPU count for big jobs, 0 = no pool)")
+            sp.add_argument("--format", choices=EXPORT_FORMATS, default="txt",
+                            help="txt = Export button layout; csv / jsonl = one row per day (default: txt)")
+        sp.set_defaults(func=func)
+    sp = sub.add_parser("import", help="add past days from CSV/JSONL files (habit,date,mood,done)")
+    sp.add_argument("files", nargs="+", help=".csv or .jsonl files")
+    sp.add_argument("--batch", type=int, metavar="N",
+                    help="rows applied per batch (default: 5000)")
+    sp.set_defaults(func=cmd_import)
+    sp = sub.add_parser("corr", help="cross-habit correlation matrix and skip/mood findings")
+    sp.add_argument("habits", nargs="*", help="habit names (default: all)")
+    sp.add_argument("--range", type=parse_range, metavar="R",
+                    help="N (last N days) or START:END (default: last 90 days)")
+    sp.add_argument("--feature", choices=("done",) + tuple(MOOD_ICON), default="done",
+                    help="what to correlate (default: done)")
+    sp.set_defaults(func=cmd_corr)
+    sp = sub.add_parser("stats", help="distribution, rolling rates, streak histogram, weekdays")
+    sp.add_argument("habits", nargs="*", help="habit names (default: all)")
+    sp.add_argument("--range", type=parse_range, metavar="R", help="N (last N days) or START:END (default: 365)")
+    sp.set_defaults(func=cmd_stats)
+    sp = sub.add_parser("selfcheck", help="compare the NumPy and pure-Python analytics on your data")
+    sp.add_argument("habits", nargs="*", help="habit names (default: all)")
+    sp.set_defaults(func=cmd_selfcheck)
+    sub.add_parser("migrate", help="copy habits.json into habits.db").set_defaults(func=cmd_migrate)
+    return p
+
+def main(argv=None, t_start=None):
+    """Run one command; t_start (perf_counter before the imports) lets --time include import time."""
+    t0 = time.perf_counter()
+    args = build_parser().parse_args(argv)
+    if args.dir:
+        os.chdir(args.dir)
+    if getattr(args, "out", None) and not args.out.lower().endswith(".zip"):
+        os.makedirs(args.out, exist_ok=True)
+    if args.command != "migrate":
+        core.init_data(args.backend)
+    t1 = time.perf_counter()
+    args.func(args)
+    if args.time:
+        t2 = time.perf_counter()
+        imports = f"import {(t0 - t_start) * 1000:.1f} ms, " if t_start is not None else ""
+        print(f"[time] {imports}load {(t1 - t0) * 1000:.1f} ms, {args.command} {(t2 - t1) * 1000:.1f} ms, "
+              f"total {(t2 - (t0 if t_start is None else t_start)) * 1000:.1f} ms", file=sys.stderr)
+    return 0
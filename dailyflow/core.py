@@ -0,0 +1,132 @@
+"""Live DailyFlow+ data and the habit API shared by the GUI and the CLI (no Tk here)."""
+
+import atexit
+from datetime import date
+
+from . import storage
+from .model import MOOD_OPTIONS, RecentLog, Rollups, apply_op, day_ordinal, new_habit
+
+DATA = {"habits": {}, "recent": RecentLog()}    # + recent log: newest-first (dt, habit, mood)
+STORAGE = None                            # backend picked by init_data()
+ROLLUP_CACHE = {}                         # habits.rollups.json as loaded (see habit_rollups)
+CHANGE_HOOKS = []                         # fn(name, ordinal, old, new) after each mark/clear; see notify_change
+
+def init_data(backend=None):
+    """Open the storage backend and load DATA from it (in place, so imports of DATA stay valid)."""
+    global STORAGE
+    if STORAGE is None:
+        STORAGE = storage.make_storage(backend)
+        atexit.register(_shutdown)
+    d = load_data()
+    DATA.clear()
+    DATA.update(d)
+    ROLLUP_CACHE.clear()
+    ROLLUP_CACHE.update(storage.load_rollup_cache())
+    notify_change(None)
+    return DATA
+
+def _shutdown():
+    try:
+        storage.save_rollup_cache(DATA, ROLLUP_CACHE)
+    except OSError as e:
+        print(f"[Warning] Failed to save {storage.ROLLUP_FILE}: {e}")
+    STORAGE.close()
+
+def load_data():
+    """Load data from the configured storage backend."""
+    return STORAGE.load()
+
+def save_data():
+    """Ask the storage backend to persist the whole of DATA (returns quickly)."""
+    STORAGE.save(DATA)
+
+def notify_change(name, o=None, old=None, new=None):
+    """Tell CHANGE_HOOKS that day ordinal `o` of `name` went from old to new (done, mood code).
+
+    name=None (or o=None) means "many days changed": hooks should drop what they cached.
+    """
+    for fn in CHANGE_HOOKS:
+        fn(name, o, old, new)
+
+def record_op(op):
+    """Apply a change to DATA and hand it to the storage backend."""
+    with storage.DATA_LOCK:
+        kind, name = op.get("op"), op.get("h")
+        if kind == "clear":
+            get_habit(name)     # recomputing `last` needs the full history
+        h = DATA["habits"].get(name)
+        o = day_ordinal(op["d"]) if "d" in op else None
+        before = h["days"].state(o) if h and o is not None else None
+        storage.JOURNAL["seq"] += 1
+        op["seq"] = storage.JOURNAL["seq"]
+        apply_op(DATA, op)
+        STORAGE.record(op, DATA)
+        if CHANGE_HOOKS:
+            if before is None:
+                notify_change(name)             # habit added or deleted
+            else:
+                notify_change(name, o, before, h["days"].state(o))
+
+def ensure_habit(name):
+    """Create habit shell if not exists."""
+    if name not in DATA["habits"]:
+        DATA["habits"][name] = new_habit()
+
+def list_habits():
+    return list(DATA["habits"].keys())
+
+def get_habit(name):
+    """Return the habit dict with its full history (loading it from storage if needed)."""
+    h = DATA["habits"].get(name)
+    if h and h.get("partial"):
+        STORAGE.fill_habit(name, h)
+    return h
+
+def habit_shell(name):
+    """Return the habit dict without forcing a full load (today and the last few days are there)."""
+    return DATA["habits"].get(name)
+
+def habit_range(name, s, e):
+    """Return {iso_day: mood or None} for the completed days of `name` within [s, e]."""
+    h = DATA["habits"].get(name)
+    if not h:
+        return {}
+    if h.get("partial"):
+        return STORAGE.range(name, s, e)
+    return {d.isoformat(): m for d, m in h["days"].items(s, e)}
+
+def habit_counts(name, s, e):
+    """Return (completed days, {mood: days}) for `name` within [s, e] without walking the days."""
+    h = DATA["habits"].get(name)
+    if not h:
+        return 0, {k: 0 for k, _ in MOOD_OPTIONS}
+    if h.get("partial"):
+        return STORAGE.counts(name, s, e)
+    return h["days"].counts(s, e)
+
+def is_done(h, day):
+    """该日是否完成？day 可以是 date 或 ISO 字符串（旧数据里有 mood 也算完成，加载时已折算）。"""
+    if not h:
+        return False
+    return h["days"].is_done(day)
+
+def compute_streak(name):
+    """Count consecutive days from today backwards (based on 'done')."""
+    h = habit_shell(name)
+    if not h:
+        return 0
+    if h.get("partial"):
+        return STORAGE.streak(name, date.today())
+    return h["days"].streak(date.today())   # O(1) from the streak index
+
+def habit_rollups(name):
+    """Week/month/year totals for `name` (Rollups), or None; reuses the on-disk cache when it matches."""
+    h = get_habit(name)
+    if not h:
+        return None
+    days = h["days"]
+    if days.rollup is None:
+        c = ROLLUP_CACHE.get(name)
+        if c and c.get("fp") == days.fingerprint():
+            days.rollup = Rollups.from_json(c)
+    return days.rollups()
@@ -0,0 +1,110 @@
+"""Bulk export: many habits over one or more ranges, rendered in parallel into a folder or a zip."""
+
+import io
+import os
+import time
+import zipfile
+from collections import deque
+
+from .core import get_habit, list_habits
+from .reports import export_iter, report_filename, write_lines, write_stream
+
+# Below this many day rows a process pool costs more than it saves. Measured against
+# the in-process export (~160k-220k rows/s): the pool adds ~0.2 s to start plus
+# 10-30% for pickling and handing results back, so it needs about 2 s of work and
+# a second CPU to win (on one CPU it was never faster, and up to 75% slower).
+BULK_POOL_MIN_DAYS = 400000
+# Rendered files waiting for the writer, per worker: caps pool-mode memory.
+BULK_INFLIGHT_PER_WORKER = 2
+
+
+def _render_one(task):
+    fname, name, days, s, e, fmt = task
+    buf = io.StringIO()
+    write_stream(buf, export_iter(name, days, s, e, fmt))
+    return fname, buf.getvalue()
+
+def _unique_filename(fname, seen):
+    """`fname`, or fname with _2, _3, ... before the extension if `seen` has it (case-insensitive,
+    as on Windows/macOS); e.g. "Read Book" and "Read_Book" map to the same report_filename()."""
+    base, ext = os.path.splitext(fname)
+    k = 1
+    while fname.lower() in seen:
+        k += 1
+        fname = f"{base}_{k}{ext}"
+    seen.add(fname.lower())
+    return fname
+
+def _bounded_map(pool, fn, tasks, window):
+    """Like pool.map() (results in order), but with at most `window` tasks submitted and not yet read."""
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.submit(fn, task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def export_bulk(names, ranges, out, workers=None, fmt="txt"):
+    """Export `names` (default: all habits) for each (start, end) in `ranges`
+    into folder `out`, or into a zip if `out` ends in .zip; fmt is txt, csv or jsonl.
+
+    workers: process count (None = CPU count for jobs of BULK_POOL_MIN_DAYS day rows
+    or more on a multi-CPU machine, else in-process; 0 = render in this process).
+    In-process exports stream line chunks, so memory stays constant; with a pool
+    each worker renders a whole file, and at most BULK_INFLIGHT_PER_WORKER files
+    per worker are in flight, so memory is bounded by a few files, not the total.
+    Returns stats: habits, files, days, bytes, seconds.
+    """
+    names = list(names or list_habits())
+    t0 = time.perf_counter()
+    tasks = []
+    seen = set()
+    for n in names:
+        days = get_habit(n)["days"].copy()   # detached copy: safe to pickle while the GUI keeps editing
+        tasks.extend((_unique_filename(report_filename(n, s, e, fmt), seen), n, days, s, e, fmt)
+                     for s, e in ranges)
+    total_days = sum((e - s).days + 1 for _, _, _, s, e, _ in tasks)
+    if workers is None and (total_days < BULK_POOL_MIN_DAYS or (os.cpu_count() or 1) < 2):
+        workers = 0
+    if workers == 0:
+        # in-process: stream each export straight into its file, no whole-file strings
+        pool = None
+        results = ((fname, export_iter(n, days, s, e, f)) for fname, n, days, s, e, f in tasks)
+    else:
+        from concurrent.futures import ProcessPoolExecutor    # ~25 ms to import; only pay it here
+        pool = ProcessPoolExecutor(max_workers=workers)
+        window = (workers or os.cpu_count() or 1) * BULK_INFLIGHT_PER_WORKER
+        # a worker's text already ends in "\n"; hand it over as one line minus that newline
+        results = ((fname, [text[:-1]]) for fname, text in
+                   _bounded_map(pool, _render_one, tasks, window))
+    size = 0
+    try:
+        if out.lower().endswith(".zip"):
+            with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+                for fname, lines in results:
+                    with zf.open(fname, "w") as raw, io.TextIOWrapper(raw, encoding="utf-8") as f:
+                        write_stream(f, lines)
+                    size += zf.getinfo(fname).file_size
+        else:
+            os.makedirs(out, exist_ok=True)
+            for fname, lines in results:
+                path = os.path.join(out, fname)
+                write_lines(path, lines)
+                size += os.path.getsize(path)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return {
+        "habits": len(names),
+        "files": len(tasks),
+        "days": total_days,
+        "bytes": size,
+        "seconds": time.perf_counter() - t0,
+    }
+
+def format_stats(st, out):
+    """One-line throughput summary for an export_bulk() result."""
+    secs = max(st["seconds"], 1e-9)
+    return (f"Exported {st['files']} file(s) for {st['habits']} habit(s), {st['days']:,} days in {st['seconds']:.2f} s "
+            f"({st['days'] / secs:,.0f} days/s, {st['bytes'] / secs / 1e6:.1f} MB/s) → {out}")
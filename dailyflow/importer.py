@@ -0,0 +1,145 @@
+"""Bulk import of past days from CSV / JSONL files (the same columns the exports write).
+
+Rows are `habit, date, mood, done`: date in any format parse_date() takes,
+mood one of MOOD_ICON (or empty), done 1/0, true/false, yes/no (default: done).
+A row that is not done and has no mood clears that day. Dates after today are
+rejected, like the date fields in the app.
+"""
+
+import csv
+import json
+import time
+from collections import Counter
+from datetime import date
+
+from . import core, storage
+from .model import MOOD_ICON, new_habit, parse_date
+
+IMPORT_BATCH = 5000         # rows applied per DATA_LOCK hold
+IMPORT_SAMPLE_ERRORS = 5    # rejected rows quoted back in the stats
+
+_TRUE = {"1", "true", "yes", "y", "done", "✓"}
+_FALSE = {"0", "false", "no", "n", "", "—", "-"}
+
+
+def iter_rows(path):
+    """Yield (line number, row dict) from a .csv or .jsonl/.ndjson file, one line at a time."""
+    low = path.lower()
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if low.endswith(".csv"):
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        elif low.endswith((".jsonl", ".ndjson", ".json")):
+            for n, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield n, row
+        else:
+            raise ValueError(f"{path}: unknown import format (use .csv or .jsonl)")
+
+def parse_row(row, today=None):
+    """Return (habit, date, mood or None, done) for one input row; ValueError names the problem."""
+    if not isinstance(row, dict):
+        raise ValueError("not a record")
+    habit = str(row.get("habit") or "").strip()
+    if not habit:
+        raise ValueError("missing habit")
+    d = parse_date(str(row.get("date") or "").strip())
+    if d is None:
+        raise ValueError("bad date")
+    if d > (today or date.today()):
+        raise ValueError("future date")
+    mood = row.get("mood")
+    mood = str(mood).strip() if mood is not None else ""
+    if mood in _FALSE:
+        mood = None
+    elif mood not in MOOD_ICON:
+        raise ValueError("unknown mood")
+    done = row.get("done", True)
+    if not isinstance(done, bool):
+        v = str(done).strip().lower()
+        if v in _TRUE:
+            done = True
+        elif v in _FALSE:
+            done = False
+        else:
+            raise ValueError("bad done flag")
+    return habit, d, mood, done or mood is not None   # a mood alone counts as done, like old data
+
+def _apply_batch(batch, touched):
+    """Write one batch of parsed rows into DATA (caller holds DATA_LOCK)."""
+    per_habit = {}
+    for habit, d, mood, done in batch:
+        per_habit.setdefault(habit, []).append((d, mood, done))
+    for habit, rows in per_habit.items():
+        h = core.get_habit(habit)       # fills a lazily loaded SQLite habit first
+        if h is None:
+            h = core.DATA["habits"][habit] = new_habit()
+        h["days"].set_many(rows, reindex=False)     # reindexed once in import_rows()
+        touched.add(habit)
+
+def import_rows(rows, batch_size=IMPORT_BATCH, save=True):
+    """Apply (line number, row dict) pairs to DATA in batches, then save once (unless save=False).
+
+    Returns stats: rows, imported, rejected, habits, seconds, reasons (Counter)
+    and samples (first few rejected line numbers with their reason).
+    """
+    t0 = time.perf_counter()
+    st = {"rows": 0, "imported": 0, "rejected": 0, "reasons": Counter(), "samples": []}
+    touched = set()
+    batch = []
+    today = date.today()
+
+    def flush():
+        with storage.DATA_LOCK:
+            _apply_batch(batch, touched)
+        st["imported"] += len(batch)
+        batch.clear()
+
+    for n, row in rows:
+        st["rows"] += 1
+        try:
+            batch.append(parse_row(row, today))
+        except ValueError as ex:
+            st["rejected"] += 1
+            st["reasons"][str(ex)] += 1
+            if len(st["samples"]) < IMPORT_SAMPLE_ERRORS:
+                st["samples"].append((n, str(ex)))
+            continue
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    if touched:
+        with storage.DATA_LOCK:
+            for name in touched:
+                h = core.DATA["habits"][name]
+                h["days"].reindex()
+                h["last"] = h["days"].last_mood_before(date.max)
+        core.notify_change(None)
+        if save:
+            core.save_data()    # one snapshot for the whole import
+    st["habits"] = len(touched)
+    st["seconds"] = time.perf_counter() - t0
+    return st
+
+def import_file(path, batch_size=IMPORT_BATCH, save=True):
+    """Stream one CSV/JSONL file into DATA; see import_rows() for the stats."""
+    return import_rows(iter_rows(path), batch_size, save)
+
+def format_import_stats(st, path):
+    """Short human summary of an import_rows() result."""
+    secs = max(st["seconds"], 1e-9)
+    text = (f"Imported {st['imported']:,} of {st['rows']:,} rows into {st['habits']} habit(s) "
+            f"from {path} in {st['seconds']:.2f} s ({st['rows'] / secs:,.0f} rows/s)")
+    if st["rejected"]:
+        why = ", ".join(f"{k} ×{v}" for k, v in st["reasons"].most_common())
+        where = ", ".join(f"line {n}" for n, _ in st["samples"])
+        text += f"\nRejected {st['rejected']:,}: {why} (e.g. {where})"
+    return text
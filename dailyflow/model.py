@@ -0,0 +1,697 @@
+"""Habit data model: moods, date helpers and the compact per-habit history.
+
+Nothing here touches the disk or Tk; a data dict looks like
+{"habits": {name: {"days": HabitHistory, "last": mood}}, "recent": RecentLog}.
+"""
+
+from array import array                 # 紧凑的逐日数组
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import date, timedelta, datetime
+import zlib                             # 汇总缓存的校验指纹
+
+# Unified date format
+DATE_FMT = "%d-%m-%Y"
+
+# -----------------------------
+# Mood options
+# -----------------------------
+MOOD_OPTIONS = [
+    ("happy",    "😊"),
+    ("neutral",  "😐"),
+    ("tired",    "😪"),
+    ("stressed", "😰"),
+]
+MOOD_ICON = {}
+for k, v in MOOD_OPTIONS:
+    MOOD_ICON[k] = v
+
+# Byte codes used by the compact history arrays (0 = no mood)
+MOOD_NAMES = [None] + [k for k, _ in MOOD_OPTIONS]
+MOOD_CODES = {k: i for i, k in enumerate(MOOD_NAMES) if k}
+
+# -----------------------------
+# Dates
+# -----------------------------
+def today_str():
+    """Return today's date in YYYY-MM-DD."""
+    return date.today().isoformat()
+
+def parse_date(s):
+    """Parse 'YYYY-MM-DD' or 'DD-MM-YYYY' (trims spaces). Return date or None."""
+    try:
+        s = (s or "").strip()
+        parts = s.split("-")
+        if len(parts) != 3:
+            return None
+        a, b, c = (p.strip() for p in parts)
+        # try YYYY-MM-DD first
+        if len(a) == 4 and a.isdigit() and b.isdigit() and c.isdigit():
+            y, m, d = int(a), int(b), int(c)
+        else:
+            # try DD-MM-YYYY
+            if not (a.isdigit() and b.isdigit() and c.isdigit() and len(c) == 4):
+                return None
+            d, m, y = int(a), int(b), int(c)
+        return date(y, m, d)
+    except Exception:
+        return None
+
+def fmt_date_obj(d):
+    """Format a date object as DD-MM-YYYY for display."""
+    try:
+        return d.strftime(DATE_FMT)
+    except Exception:
+        return "--"
+
+def fmt_date_iso(iso_s):
+    """Format an ISO date string YYYY-MM-DD as DD-MM-YYYY for display."""
+    d = parse_date(iso_s)
+    return d.strftime(DATE_FMT) if d else iso_s
+
+def daterange(d1, d2):
+    """Return list of days [d1..d2]."""
+    out = []
+    cur = d1
+    while cur <= d2:
+        out.append(cur)
+        cur += timedelta(days=1)
+    return out
+
+# -----------------------------
+# Compact per-habit history
+# -----------------------------
+_WARNED_MOODS = set()      # unknown mood names already reported
+
+def mood_code(m):
+    """Return the byte code for mood `m` (0 = none); unknown moods are stored as none."""
+    if not m:
+        return 0
+    c = MOOD_CODES.get(m)
+    if c is None:
+        if m not in _WARNED_MOODS:
+            _WARNED_MOODS.add(m)
+            print(f"[Warning] Unknown mood {m!r} stored as no mood (the day stays done)")
+        return 0
+    return c
+
+def day_ordinal(d):
+    """Accept a date, an ISO 'YYYY-MM-DD' string or an ordinal; return the ordinal."""
+    if isinstance(d, int):
+        return d
+    if isinstance(d, str):
+        return date.fromisoformat(d).toordinal()
+    return d.toordinal()
+
+class HabitHistory:
+    """One habit's days packed into arrays instead of {iso_str: ...} dicts.
+
+    Day ordinal `o` lives at index o - start: `moods` holds one mood code per
+    day (0 = none) and `bits` one completion bit per day. `start` is kept a
+    multiple of 8 so growing backwards only prepends whole bytes.
+
+    A streak index rides along: `run_start`..`run_end` (ordinals) is the run
+    ending at the last completed day and `best_before` the longest run before
+    it. Marking or clearing the newest day updates it in O(1); edits deeper in
+    the past rebuild it.
+
+    Range counts come from prefix sums: `cum[0][i]` is the number of completed
+    days before index i and `cum[k][i]` the number of days with mood code k.
+    They are built on the first counts() call and then patched on every
+    set/clear (O(1) for the newest day, O(days after it) otherwise).
+
+    `marks` is the sorted array of completed-day ordinals, so first/last,
+    previous/next entry and "days since last mark" are a bisect away.
+
+    `rollup` (a Rollups, built on first use) holds week/month/year totals and
+    is patched in O(1) by set/clear.
+    """
+
+    __slots__ = ("start", "moods", "bits", "run_start", "run_end", "best_before", "cum", "marks", "rollup")
+
+    def __init__(self):
+        self.start = 0
+        self.moods = array("B")
+        self.bits = bytearray()
+        self.run_start = self.run_end = None
+        self.best_before = 0
+        self.cum = None
+        self.marks = array("l")
+        self.rollup = None
+
+    def _bit(self, i):
+        return (self.bits[i >> 3] >> (i & 7)) & 1
+
+    def _index(self, o):
+        i = o - self.start
+        return i if 0 <= i < len(self.moods) else -1
+
+    def _grow(self, o):
+        """Make room for ordinal `o`; return its index."""
+        if not self.moods:
+            self.start = o - o % 8
+        elif o < self.start:
+            new_start = o - o % 8
+            pad = self.start - new_start
+            self.moods[:0] = array("B", bytes(pad))
+            self.bits[:0] = bytes(pad // 8)
+            self.start = new_start
+            self.cum = None     # rare: rebuilt on the next counts()
+        i = o - self.start
+        if i >= len(self.moods):
+            grow = i + 1 - len(self.moods)
+            self.moods.frombytes(bytes(grow))
+            need = (len(self.moods) + 7) // 8
+            if need > len(self.bits):
+                self.bits.extend(bytes(need - len(self.bits)))
+            if self.cum is not None:
+                for c in self.cum:
+                    c.extend([c[-1]] * grow)
+        return i
+
+    def mood(self, d):
+        """Mood code name on day `d`, or None."""
+        i = self._index(day_ordinal(d))
+        return MOOD_NAMES[self.moods[i]] if i >= 0 else None
+
+    def is_done(self, d):
+        """Was day `d` completed?"""
+        i = self._index(day_ordinal(d))
+        return i >= 0 and self._bit(i) == 1
+
+    def state(self, d):
+        """(done bit, mood code) of day `d`; (0, 0) outside the stored range."""
+        i = self._index(day_ordinal(d))
+        return (self._bit(i), self.moods[i]) if i >= 0 else (0, 0)
+
+    def set(self, d, mood, done=True):
+        """Record `mood` (may be None) on day `d` and set its completion bit."""
+        o = day_ordinal(d)
+        i = self._grow(o)
+        was, old = self._bit(i), self.moods[i]
+        self.moods[i] = code = mood_code(mood)
+        if done:
+            self.bits[i >> 3] |= 1 << (i & 7)
+        else:
+            self.bits[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+        if was != bool(done):
+            self._streak_changed(o, done)
+            self._mark_flip(o, done)
+        self._cum_patch(i, was, old, int(bool(done)), code)
+        if self.rollup is not None:
+            self.rollup.patch(o, was, old, int(bool(done)), code)
+
+    def clear(self, d):
+        """Forget day `d` (mood and completion)."""
+        o = day_ordinal(d)
+        i = self._index(o)
+        if i >= 0:
+            was, old = self._bit(i), self.moods[i]
+            self.moods[i] = 0
+            self.bits[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+            if was:
+                self._streak_changed(o, False)
+                self._mark_flip(o, False)
+            self._cum_patch(i, was, old, 0, 0)
+            if self.rollup is not None:
+                self.rollup.patch(o, was, old, 0, 0)
+
+    def set_many(self, rows, reindex=True):
+        """Apply many (day, mood or None, done) writes at once (done=False clears the day).
+
+        Unlike set()/clear() this skips the per-day index upkeep: the streak
+        index is rebuilt once at the end and the prefix sums on the next counts().
+        With reindex=False the streak index and `marks` are left stale too; the
+        caller must call reindex() after its last set_many().
+        """
+        rows = [(day_ordinal(d), mood_code(m) if done else 0, done) for d, m, done in rows]
+        if not rows:
+            return
+        self.cum = self.rollup = None
+        self._grow(min(r[0] for r in rows))     # grow each way once, not once per row
+        self._grow(max(r[0] for r in rows))
+        moods, bits, start = self.moods, self.bits, self.start
+        for o, code, done in rows:
+            i = o - start
+            moods[i] = code
+            if done:
+                bits[i >> 3] |= 1 << (i & 7)
+            else:
+                bits[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+        if reindex:
+            self.reindex()
+
+    def reindex(self):
+        """Rebuild the streak index and `marks` from the stored bits."""
+        self._rebuild_streaks()
+        self._rebuild_marks()
+
+    # ---- sorted date index ----
+    def _mark_flip(self, o, now_done):
+        """Insert/remove ordinal `o` in `marks` (an append/pop at the newest end)."""
+        m = self.marks
+        if now_done:
+            if not m or o > m[-1]:
+                m.append(o)
+            else:
+                m.insert(bisect_left(m, o), o)
+        else:
+            k = bisect_left(m, o)
+            if k < len(m) and m[k] == o:
+                del m[k]
+
+    def _rebuild_marks(self):
+        bits, start = self.bits, self.start
+        self.marks = array("l", (start + i for i in range(len(self.moods))
+                                 if (bits[i >> 3] >> (i & 7)) & 1))
+
+    def first_day(self):
+        """Earliest completed day, or None."""
+        return date.fromordinal(self.marks[0]) if self.marks else None
+
+    def last_day(self):
+        """Latest completed day, or None."""
+        return date.fromordinal(self.marks[-1]) if self.marks else None
+
+    def prev_day(self, d):
+        """Latest completed day before `d`, or None."""
+        k = bisect_left(self.marks, day_ordinal(d))
+        return date.fromordinal(self.marks[k - 1]) if k else None
+
+    def next_day(self, d):
+        """Earliest completed day after `d`, or None."""
+        k = bisect_right(self.marks, day_ordinal(d))
+        return date.fromordinal(self.marks[k]) if k < len(self.marks) else None
+
+    def days_since_last(self, today):
+        """Days from the latest completed day up to `today` (0 = done today), or None."""
+        o = day_ordinal(today)
+        k = bisect_right(self.marks, o)
+        return o - self.marks[k - 1] if k else None
+
+    # ---- streak index ----
+    def _streak_changed(self, o, now_done):
+        """Update the run bookkeeping after day `o` flipped; O(1) at the newest end."""
+        if now_done:
+            if self.run_end is None:
+                self.run_start = self.run_end = o    # first completed day
+                return
+            if o == self.run_end + 1:
+                self.run_end = o                     # streak continues
+                return
+            if o > self.run_end + 1:
+                # gap: the old run is closed, a new one starts
+                self.best_before = max(self.best_before, self.run_end - self.run_start + 1)
+                self.run_start = self.run_end = o
+                return
+        elif o == self.run_end and o > self.run_start:
+            self.run_end = o - 1                     # today cleared
+            return
+        self._rebuild_streaks()
+
+    def _rebuild_streaks(self):
+        """Recompute the streak index with one backwards scan."""
+        self.run_start = self.run_end = None
+        self.best_before = 0
+        i = len(self.moods) - 1
+        while i >= 0 and not self._bit(i):
+            i -= 1
+        if i < 0:
+            return
+        end = i
+        while i >= 0 and self._bit(i):
+            i -= 1
+        self.run_start, self.run_end = self.start + i + 1, self.start + end
+        best = run = 0
+        while i >= 0:
+            if self._bit(i):
+                run += 1
+                if run > best:
+                    best = run
+            else:
+                run = 0
+            i -= 1
+        self.best_before = best
+
+    def _run_start(self, o):
+        """First day (ordinal) of the run of completed days holding `o`, or None.
+
+        O(1) inside the newest run; otherwise a bisect over `marks`, where
+        marks[j] - j is constant along a run and only grows across a gap.
+        """
+        if self.run_end is not None and self.run_start <= o <= self.run_end:
+            return self.run_start
+        m = self.marks
+        k = bisect_left(m, o)
+        if k == len(m) or m[k] != o:
+            return None
+        lo, hi = 0, k
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if m[mid] - mid < o - k:
+                lo = mid + 1
+            else:
+                hi = mid
+        return m[lo]
+
+    def streak(self, today):
+        """Current streak: completed days counted back from `today` (0 if today is not done yet).
+
+        Days after `today` (future-dated imports) don't end it.
+        """
+        o = day_ordinal(today)
+        first = self._run_start(o)
+        return 0 if first is None else o - first + 1
+
+    def streak_start(self, today):
+        """First day of the current streak, or None."""
+        first = self._run_start(day_ordinal(today))
+        return None if first is None else date.fromordinal(first)
+
+    def longest_streak(self):
+        """Longest run of completed days ever."""
+        if self.run_end is None:
+            return 0
+        return max(self.best_before, self.run_end - self.run_start + 1)
+
+    # ---- prefix-sum range index ----
+    def _build_cum(self):
+        k_max = len(MOOD_OPTIONS)
+        cum = [array("I", [0]) for _ in range(k_max + 1)]
+        done_c, mood_c = cum[0], cum[1:]
+        counts = [0] * (k_max + 1)
+        moods = self.moods
+        for i in range(len(moods)):
+            if self._bit(i):
+                counts[0] += 1
+            m = moods[i]
+            if 0 < m <= k_max:
+                counts[m] += 1
+            done_c.append(counts[0])
+            for k in range(k_max):
+                mood_c[k].append(counts[k + 1])
+        self.cum = cum
+
+    def _cum_patch(self, i, old_done, old_code, new_done, new_code):
+        """Shift the prefix sums after index i by what changed at i."""
+        if self.cum is None:
+            return
+        deltas = {}
+        if old_done != new_done:
+            deltas[0] = new_done - old_done
+        if old_code != new_code:
+            for k, dv in ((old_code, -1), (new_code, 1)):
+                if 0 < k < len(self.cum):
+                    deltas[k] = deltas.get(k, 0) + dv
+        for k, dv in deltas.items():
+            c = self.cum[k]
+            for j in range(i + 1, len(c)):
+                c[j] += dv
+
+    def counts(self, s, e):
+        """(completed days, {mood: days}) within [s, e], answered in O(1) from the prefix sums."""
+        if self.cum is None:
+            self._build_cum()
+        n = len(self.moods)
+        lo = min(max(0, day_ordinal(s) - self.start), n)
+        hi = max(lo, min(max(0, day_ordinal(e) - self.start + 1), n))
+        cum = self.cum
+        return cum[0][hi] - cum[0][lo], {
+            MOOD_NAMES[k]: cum[k][hi] - cum[k][lo] for k in range(1, len(cum))
+        }
+
+    def last_mood_before(self, d):
+        """Mood of the latest completed day before `d` that has one, else None."""
+        marks, moods, start = self.marks, self.moods, self.start
+        k = bisect_left(marks, day_ordinal(d)) - 1
+        while k >= 0:               # usually the first step: a mark without a mood is rare
+            m = moods[marks[k] - start]
+            if m:
+                return MOOD_NAMES[m]
+            k -= 1
+        return None
+
+    def items(self, s=None, e=None):
+        """Yield (date, mood or None) for completed days, oldest first, optionally within [s, e]."""
+        lo = 0 if s is None else max(0, s.toordinal() - self.start)
+        hi = len(self.moods) if e is None else min(len(self.moods), e.toordinal() - self.start + 1)
+        moods, bits, start = self.moods, self.bits, self.start
+        for i in range(lo, hi):
+            if (bits[i >> 3] >> (i & 7)) & 1:
+                yield date.fromordinal(start + i), MOOD_NAMES[moods[i]]
+
+    def rollups(self):
+        """Week/month/year totals, built with one pass on first use."""
+        if self.rollup is None:
+            self.rollup = Rollups.build(self)
+        return self.rollup
+
+    def fingerprint(self):
+        """Cheap content tag used to check that a persisted rollup still matches."""
+        return f"{self.start}:{len(self.moods)}:{zlib.crc32(self.moods)}:{zlib.crc32(self.bits)}"
+
+    def copy(self):
+        c = HabitHistory()
+        c.start, c.moods, c.bits = self.start, array("B", self.moods), bytearray(self.bits)
+        c.run_start, c.run_end, c.best_before = self.run_start, self.run_end, self.best_before
+        c.marks = array("l", self.marks)
+        return c
+
+    def to_json(self):
+        """Return the on-disk ({iso: mood}, {iso: True}) pair."""
+        history, done = {}, {}
+        for d, m in self.items():
+            ds = d.isoformat()
+            done[ds] = True
+            if m:
+                history[ds] = m
+        return history, done
+
+    @classmethod
+    def from_json(cls, history, done):
+        """Build from the on-disk dicts; a mood without a done flag still counts as done (old data)."""
+        hh = cls()
+        for src in (done or {}, history or {}):
+            for ds, v in src.items():
+                if not v:
+                    continue
+                try:
+                    o = day_ordinal(ds)
+                except (TypeError, ValueError):
+                    print(f"[Warning] Skipped bad date {ds!r}")
+                    continue
+                i = hh._grow(o)
+                if src is history:
+                    hh.moods[i] = mood_code(v)
+                hh.bits[i >> 3] |= 1 << (i & 7)
+        hh._rebuild_streaks()   # once, instead of per day in file order
+        hh._rebuild_marks()
+        return hh
+
+# -----------------------------
+# Week / month / year rollups
+# -----------------------------
+def period_keys(d):
+    """('2025-W41', '2025-10', '2025') for a date or ordinal (ISO weeks)."""
+    if isinstance(d, int):
+        d = date.fromordinal(d)
+    y, w, _ = d.isocalendar()
+    return f"{y}-W{w:02d}", f"{d.year}-{d.month:02d}", str(d.year)
+
+ROLLUP_LEVELS = ("week", "month", "year")
+
+class Rollups:
+    """Totals per ISO week, month and year: key -> [done days, days per built-in mood...].
+
+    patch() applies one day's change to its three buckets, so keeping them
+    current costs O(1) per mark/clear.
+    """
+
+    __slots__ = ("levels",)
+
+    def __init__(self):
+        self.levels = {lv: {} for lv in ROLLUP_LEVELS}
+
+    @classmethod
+    def build(cls, days):
+        r = cls()
+        moods, start = days.moods, days.start
+        for o in days.marks:
+            r.patch(o, 0, 0, 1, moods[o - start])
+        for i, m in enumerate(moods):
+            if m and not days._bit(i):
+                r.patch(start + i, 0, 0, 0, m)     # mood without a mark (rare)
+        return r
+
+    def patch(self, o, old_done, old_code, new_done, new_code):
+        """Move day `o` from (old_done, old_code) to (new_done, new_code)."""
+        if old_done == new_done and old_code == new_code:
+            return
+        width = len(MOOD_OPTIONS) + 1
+        for lv, key in zip(ROLLUP_LEVELS, period_keys(o)):
+            b = self.levels[lv].get(key)
+            if b is None:
+                b = self.levels[lv][key] = [0] * width
+            b[0] += new_done - old_done
+            if 0 < old_code < width:
+                b[old_code] -= 1
+            if 0 < new_code < width:
+                b[new_code] += 1
+
+    def get(self, level, key):
+        """(done days, {mood: days}) for one bucket, e.g. get("month", "2025-10")."""
+        b = self.levels[level].get(key)
+        if b is None:
+            return 0, {k: 0 for k, _ in MOOD_OPTIONS}
+        return b[0], {MOOD_NAMES[k]: b[k] for k in range(1, len(b))}
+
+    def to_json(self):
+        return {lv: {k: b for k, b in buckets.items() if any(b)} for lv, buckets in self.levels.items()}
+
+    @classmethod
+    def from_json(cls, raw):
+        r = cls()
+        width = len(MOOD_OPTIONS) + 1
+        for lv in ROLLUP_LEVELS:
+            for k, b in (raw.get(lv) or {}).items():
+                if isinstance(b, list) and len(b) == width:
+                    r.levels[lv][k] = [int(x) for x in b]
+        return r
+
+def new_habit():
+    """Return an empty habit record."""
+    return {"days": HabitHistory(), "last": None}
+
+# -----------------------------
+# Recent activity log
+# -----------------------------
+RECENT_MAX = 50
+
+class RecentLog:
+    """Newest-first activity log: a deque of [dt, habit, mood, alive] plus a {habit: {day: [entries]}} index.
+
+    Dropping a habit's entries (all, or one day's) goes through the index and
+    only flips `alive`; dead entries are popped once they reach the tail, or
+    swept when they pile up. At most `maxlen` live entries are kept.
+    On disk it is a plain newest-first list of [dt, habit, mood] triples.
+    """
+
+    __slots__ = ("q", "by_habit", "live", "maxlen")
+
+    def __init__(self, maxlen=RECENT_MAX):
+        self.q = deque()
+        self.by_habit = {}
+        self.live = 0
+        self.maxlen = maxlen
+
+    def __len__(self):
+        return self.live
+
+    def __iter__(self):
+        """Yield (dt, habit, mood) for live entries, newest first."""
+        for e in self.q:
+            if e[3]:
+                yield e[0], e[1], e[2]
+
+    def push(self, dt, habit, mood):
+        """Add a newest entry; the oldest live one falls off past maxlen."""
+        e = [dt, habit, mood, True]
+        self.q.appendleft(e)
+        self.by_habit.setdefault(habit, {}).setdefault((dt or "")[:10], []).append(e)
+        self.live += 1
+        self._trim()
+
+    def discard(self, habit, day=None):
+        """Drop every entry of `habit` (or only those logged on ISO `day`)."""
+        days = self.by_habit.get(habit)
+        if not days:
+            return
+        if day is None:
+            groups = self.by_habit.pop(habit).values()
+        else:
+            groups = [days.pop(day, [])]
+        for group in groups:
+            for e in group:
+                e[3] = False
+                self.live -= 1
+        self._trim()
+
+    def _trim(self):
+        q = self.q
+        while q and (self.live > self.maxlen or not q[-1][3]):
+            e = q.pop()
+            if e[3]:
+                e[3] = False
+                self.live -= 1
+                days = self.by_habit[e[1]]
+                day = (e[0] or "")[:10]
+                del days[day][0]    # groups are in push order, so e is the oldest of its group
+                if not days[day]:
+                    del days[day]
+        if len(q) > 2 * self.maxlen:
+            self.q = deque(e for e in q if e[3])    # sweep piled-up tombstones
+
+    def to_json(self):
+        return [[dt, habit, mood] for dt, habit, mood in self]
+
+    @classmethod
+    def from_json(cls, raw, maxlen=RECENT_MAX):
+        """Build from [dt, habit, mood] triples or the older {dt, habit, mood} dicts (newest first)."""
+        log = cls(maxlen)
+        rows = []
+        for r in raw if isinstance(raw, (list, RecentLog)) else []:
+            if isinstance(r, dict):
+                rows.append((r.get("dt"), r.get("habit"), r.get("mood")))
+            elif isinstance(r, (list, tuple)) and len(r) >= 3:
+                rows.append(tuple(r[:3]))
+        for dt, habit, mood in reversed(rows[:maxlen]):
+            log.push(dt, habit, mood)
+        return log
+
+# -----------------------------
+# Changes
+# -----------------------------
+def _recent(d):
+    """The RecentLog of data dict `d` (converted in place if it is still a plain list)."""
+    r = d.get("recent")
+    if not isinstance(r, RecentLog):
+        r = d["recent"] = RecentLog.from_json(r)
+    return r
+
+def push_recent(d, habit, mood, dt=None):
+    """Log a newest action in the recent log of `d` (capped at RECENT_MAX entries)."""
+    _recent(d).push(dt or datetime.now().isoformat(timespec="seconds"), habit, mood)
+
+def apply_op(d, op):
+    """Apply one change record to data dict `d` (used live and when replaying the journal).
+
+    Records: {"op": "add"|"set", "h", "d", "m"[, "t"]}, {"op": "clear", "h", "d", "t"},
+    {"op": "del", "h"}; "d" is an ISO day and "t" the timestamp for the recent log.
+    """
+    kind = op.get("op")
+    name = op.get("h")
+    habits = d["habits"]
+    recent = _recent(d)
+    if kind in ("add", "set"):
+        h = habits.get(name)
+        if h is None:
+            h = habits[name] = new_habit()
+        h["days"].set(op["d"], op["m"])
+        h["last"] = op["m"]
+        if kind == "set":
+            push_recent(d, name, op["m"], dt=op.get("t"))
+    elif kind == "clear":
+        h = habits.get(name)
+        if h is None:
+            return
+        t = op["d"]
+        h["days"].clear(t)
+        # 重新估算 last：用最近一次（早于今天）的记录，否则置空
+        h["last"] = h["days"].last_mood_before(t)
+        # 从 recent 里移除“今天此习惯”的原有记录，并新增一条“Clear”记录
+        recent.discard(name, t)
+        recent.push(op.get("t"), name, "cleared")
+    elif kind == "del":
+        habits.pop(name, None)
+        # 清理与该习惯相关的 recent 记录
+        recent.discard(name)
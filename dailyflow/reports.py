@@ -0,0 +1,135 @@
+"""Reports and exports (TXT, CSV, JSONL) shared by the Report/Export dialogs and the CLI."""
+
+import calendar
+import json
+from datetime import date
+from itertools import islice
+
+from .core import compute_streak, get_habit, habit_counts, habit_range, habit_rollups
+from .model import DATE_FMT, MOOD_ICON, daterange, fmt_date_iso, fmt_date_obj, period_keys
+
+EXPORT_FORMATS = ("txt", "csv", "jsonl")
+WRITE_CHUNK_LINES = 4096    # lines joined per write() when streaming a file
+_FILENAME_UNSAFE = str.maketrans({" ": "_", "/": "_", "\\": "_"})
+
+
+def report_filename(habit, s, e, fmt="txt"):
+    """Default file name for an export, e.g. report_Read_Book_01-10-2025_to_07-10-2025.txt.
+
+    Spaces and path separators in the habit name become "_", so the name never
+    points into another folder.
+    """
+    safe = habit.translate(_FILENAME_UNSAFE)
+    return f"report_{safe}_{fmt_date_obj(s)}_to_{fmt_date_obj(e)}.{fmt}"
+
+def report_summary(habit, s, e):
+    """Summary lines (completion bar, mood counts, streaks) from the O(1) range index."""
+    done_cnt, counts = habit_counts(habit, s, e)
+    total = (e - s).days + 1
+    fill = int(round((done_cnt / total) * 10)) if total else 0
+    bar = "█" * fill + "░" * (10 - fill)
+    days = get_habit(habit)["days"]
+    best = days.longest_streak()
+    lines = [
+        f"Completion: [{bar}] {done_cnt}/{total} days",
+        f"😊 {counts['happy']}  😐 {counts['neutral']}  😪 {counts['tired']}  😰 {counts['stressed']}",
+        f"Streak: {compute_streak(habit)} now · best {best} day{'s' if best != 1 else ''}",
+    ]
+    first, last = days.first_day(), days.last_day()
+    if first:
+        ago = days.days_since_last(date.today())
+        when = "today" if ago == 0 else (f"{ago} day{'s' if ago != 1 else ''} ago" if ago else "upcoming")
+        lines.append(f"Entries: first {fmt_date_obj(first)} · last {fmt_date_obj(last)} ({when})")
+    # month / year totals of the end date straight from the rollups
+    _, month_key, year_key = period_keys(e)
+    r = habit_rollups(habit)
+    m_done, _ = r.get("month", month_key)
+    y_done, _ = r.get("year", year_key)
+    lines.append(f"{calendar.month_abbr[e.month]} {e.year}: {m_done}/{calendar.monthrange(e.year, e.month)[1]} days"
+                 f" · {e.year}: {y_done} days")
+    if total >= 7 and done_cnt:
+        from .analytics import weekday_breakdown    # lazy: keeps analytics off the startup path
+        wk = weekday_breakdown(habit, s, e)
+        rates = [r["done"] / r["days"] for r in wk]
+        k = max(range(7), key=rates.__getitem__)
+        lines.append(f"Best weekday: {calendar.day_abbr[k]} ({rates[k]:.0%} done)")
+    return lines
+
+def report_lines(habit, s, e):
+    """Lines of the Report window: one row per day, then the summary."""
+    by = habit_range(habit, s, e)   # {iso_day: mood} for completed days
+    lines = []
+    lines.append(f"Report — {habit}")
+    lines.append(f"Range  — {fmt_date_obj(s)} to {fmt_date_obj(e)}")
+    lines.append("-" * 40)
+    for d in daterange(s, e):
+        ds = d.isoformat()
+        m = by.get(ds)
+        icon = MOOD_ICON.get(m, "—")
+        stamp = "✓" if ds in by else "—"
+        lines.append(f"{fmt_date_iso(ds)}: {stamp}  {icon} {m or '—'}")
+    lines.append("-" * 40)
+    lines.extend(report_summary(habit, s, e))
+    return lines
+
+# ------------- Streaming export -------------
+
+def export_rows(days, s, e):
+    """Yield (date, mood or None, done) for every day in [s, e], walking the history once."""
+    marks = days.items(s, e)        # completed days, oldest first
+    nxt = next(marks, None)
+    for o in range(s.toordinal(), e.toordinal() + 1):
+        d = date.fromordinal(o)
+        if nxt is not None and nxt[0] == d:
+            yield d, nxt[1], True
+            nxt = next(marks, None)
+        else:
+            yield d, None, False
+
+def _csv_cell(v):
+    v = v or ""
+    if any(c in v for c in ',"\r\n'):
+        return '"' + v.replace('"', '""') + '"'
+    return v
+
+def export_iter(habit, days, s, e, fmt="txt"):
+    """Yield the lines of one export in `fmt` (txt = Export button layout, csv, jsonl)."""
+    rows = export_rows(days, s, e)
+    if fmt == "txt":
+        yield "DailyFlow+ Report"
+        yield f"Habit: {habit}"
+        yield f"Range: {fmt_date_obj(s)} to {fmt_date_obj(e)}"
+        yield "-" * 40
+        for d, m, _ in rows:
+            yield f"{d.strftime(DATE_FMT)}: {MOOD_ICON.get(m, '—')} {m or '—'}"
+    elif fmt == "csv":
+        yield "habit,date,mood,done"
+        h = _csv_cell(habit)
+        for d, m, done in rows:
+            yield f"{h},{d.isoformat()},{_csv_cell(m)},{int(done)}"
+    elif fmt == "jsonl":
+        h = json.dumps(habit, ensure_ascii=False)
+        for d, m, done in rows:
+            yield (f'{{"habit": {h}, "date": "{d.isoformat()}", '
+                   f'"mood": {json.dumps(m, ensure_ascii=False)}, "done": {"true" if done else "false"}}}')
+    else:
+        raise ValueError(f"unknown export format {fmt!r}")
+
+def export_lines(habit, s, e, fmt="txt"):
+    """Lines of an export of `habit` over [s, e] (a generator; see export_iter)."""
+    return export_iter(habit, get_habit(habit)["days"], s, e, fmt)
+
+def write_stream(f, lines):
+    """Write lines to an open text file, WRITE_CHUNK_LINES per write(); each line gets a newline."""
+    it = iter(lines)
+    while True:
+        chunk = list(islice(it, WRITE_CHUNK_LINES))
+        if not chunk:
+            break
+        chunk.append("")
+        f.write("\n".join(chunk))
+
+def write_lines(path, lines):
+    """Write report/export lines to `path` (UTF-8), streaming so long exports stay small in memory."""
+    with open(path, "w", encoding="utf-8") as f:
+        write_stream(f, lines)
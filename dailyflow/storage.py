@@ -0,0 +1,476 @@
+"""Persistence for DailyFlow+ data: habits.json + journal, or SQLite.
+
+Backends expose load() -> data dict, record(op, d) for one change already
+applied to `d`, save(d) for a full write, and close().
+"""
+
+import json
+import os
+import shutil
+import sqlite3                          # 可选的 SQLite 存储后端
+import threading                        # 后台保存线程
+from datetime import date, datetime, timedelta
+
+from .model import MOOD_OPTIONS, HabitHistory, RecentLog, apply_op
+
+DATA_FILE = "habits.json"
+
+# Where the data lives on disk: "json" (habits.json + journal) or "sqlite" (habits.db).
+# The first start with "sqlite" migrates an existing habits.json automatically.
+STORAGE_BACKEND = "json"
+DB_FILE = "habits.db"
+SQLITE_PRELOAD_DAYS = 7     # days per habit loaded at startup; older history loads on demand
+
+# Journal mode: every change is appended as one compact line to JOURNAL_FILE
+# instead of rewriting DATA_FILE; the log is replayed on top of the snapshot
+# at startup and folded into a fresh snapshot once it grows too large.
+JOURNAL_MODE = True
+JOURNAL_FILE = "habits.journal"
+JOURNAL_SEALED = JOURNAL_FILE + ".compacting"   # log segment being folded into the snapshot
+JOURNAL_COMPACT_BYTES = 256 * 1024
+JOURNAL = {"seq": 0}                            # last written record number
+
+# Snapshots are written by one background worker: a burst of changes becomes
+# a single write, the file is replaced atomically and older copies are kept.
+SAVE_COALESCE_SEC = 0.3     # wait this long after the first change before writing
+SAVE_BACKUPS = 3            # habits.json.1 (newest) … habits.json.3
+DATA_LOCK = threading.RLock()   # guards the live data dict between the UI thread and the save worker
+
+# Week/month/year totals are cached here between runs (rebuilt if the history no longer matches).
+ROLLUP_FILE = "habits.rollups.json"
+
+def _read_snapshot(path):
+    """Return the parsed snapshot at `path`, or None if missing/unreadable."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            d = json.load(f)
+        if isinstance(d, dict):
+            return d
+        print(f"[Warning] Ignoring {path}: not a JSON object")
+    except Exception as e:
+        print(f"[Warning] Failed to load {path}: {e}")
+    return None
+
+def _corrupt_name(path):
+    """A fresh `path`.corrupt-<timestamp> name, so earlier damaged copies are kept too."""
+    base = f"{path}.corrupt-{datetime.now():%Y%m%d-%H%M%S}"
+    name, k = base, 1
+    while os.path.exists(name):
+        k += 1
+        name = f"{base}-{k}"
+    return name
+
+def load_json_data(path=None):
+    """Load data from JSON file (or its newest good backup), then replay the journal on top of it."""
+    path = path or DATA_FILE
+    d = _read_snapshot(path)
+    if d is None and os.path.exists(path):
+        # keep the damaged file for inspection instead of overwriting it on the next save
+        os.replace(path, _corrupt_name(path))
+    for i in range(1, SAVE_BACKUPS + 1):
+        if d is not None:
+            break
+        d = _read_snapshot(f"{path}.{i}")
+        if d is not None:
+            print(f"[Warning] Restored data from backup {path}.{i}")
+    if d is None:
+        d = {"habits": {}, "recent": []}
+    if "habits" not in d or not isinstance(d["habits"], dict):
+        d["habits"] = {}
+    d["recent"] = RecentLog.from_json(d.get("recent"))  # old {dt, habit, mood} dicts load too
+    # 打包成紧凑数组；没有 done 字段的旧数据照样兼容
+    for name, h in list(d["habits"].items()):
+        if not isinstance(h, dict):
+            h = {}
+        d["habits"][name] = {
+            "days": HabitHistory.from_json(h.get("history"), h.get("done")),
+            "last": h.get("last"),
+        }
+    JOURNAL["seq"] = replay_journal(d, d.pop("journal_seq", 0))
+    return d
+
+def write_json_atomic(path, obj, backups=0, indent=2):
+    """Write `obj` to a temp file, fsync it, rotate `backups` old copies and rename it into place."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=indent,
+                  separators=None if indent else (",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    if backups and os.path.exists(path):
+        for i in range(backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{i}"):
+                os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+        # hard link keeps `path` in place until the rename below swaps it
+        try:
+            os.link(path, f"{path}.1")
+        except OSError:
+            shutil.copy2(path, f"{path}.1")
+    os.replace(tmp, path)
+    try:
+        # make the rename itself durable (POSIX only)
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except (OSError, AttributeError):
+        pass
+
+# --- Journal helpers ---
+def replay_journal(d, base_seq=0):
+    """Replay journal records newer than `base_seq` into `d`; return the last seq seen."""
+    seq = base_seq
+    for path in (JOURNAL_SEALED, JOURNAL_FILE):
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    continue  # torn last line after a crash
+                if not isinstance(op, dict) or op.get("seq", 0) <= base_seq:
+                    continue  # already folded into the snapshot
+                try:
+                    apply_op(d, op)
+                except Exception as e:
+                    print(f"[Warning] Skipped journal record {op.get('seq')}: {e}")
+                seq = max(seq, op.get("seq", 0))
+    return seq
+
+def _snapshot(d):
+    """Copy the data dict deep enough that a background writer can own it (array copies only)."""
+    return {
+        "habits": {n: {"days": h["days"].copy(), "last": h.get("last")} for n, h in d["habits"].items()},
+        "recent": d["recent"].to_json(),
+    }
+
+def to_json_data(d):
+    """Convert a data dict to the habits.json layout (history/done dicts per habit)."""
+    habits = {}
+    for n, h in d["habits"].items():
+        history, done = h["days"].to_json()
+        habits[n] = {"history": history, "done": done, "last": h.get("last")}
+    recent = d.get("recent", [])
+    out = {"habits": habits, "recent": recent.to_json() if isinstance(recent, RecentLog) else recent}
+    for k, v in d.items():
+        out.setdefault(k, v)  # journal_seq etc.
+    return out
+
+def _seal_journal():
+    """Move the live journal aside so new records start a fresh file (call under DATA_LOCK)."""
+    if not os.path.exists(JOURNAL_FILE):
+        return
+    if os.path.exists(JOURNAL_SEALED):
+        # an earlier compaction did not finish: keep its records in front
+        with open(JOURNAL_FILE, "r", encoding="utf-8") as src, \
+                open(JOURNAL_SEALED, "a", encoding="utf-8") as dst:
+            dst.write(src.read())
+        os.remove(JOURNAL_FILE)
+    else:
+        os.replace(JOURNAL_FILE, JOURNAL_SEALED)
+
+class SaveService:
+    """Single background writer that coalesces save requests into crash-safe snapshot writes."""
+
+    def __init__(self, delay=SAVE_COALESCE_SEC):
+        self.delay = delay
+        self.requests = 0       # save_data() calls
+        self.writes = 0         # snapshots actually written
+        self._data = None
+        self._cond = threading.Condition()
+        self._dirty = False
+        self._busy = False
+        self._hurry = False
+        self._thread = None
+
+    def request(self, d):
+        """Mark data dict `d` dirty; the worker writes it once the burst settles."""
+        with self._cond:
+            self.requests += 1
+            self._data = d
+            self._dirty = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="save-worker", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def flush(self, timeout=10):
+        """Block until every requested save has hit the disk (used on exit)."""
+        with self._cond:
+            self._hurry = True
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: not (self._dirty or self._busy), timeout)
+            self._hurry = False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._dirty)
+                # let the rest of the burst arrive (flush() cuts this short)
+                self._cond.wait_for(lambda: self._hurry, self.delay)
+                self._dirty = False
+                self._busy = True
+            try:
+                self._write()
+            except Exception as e:
+                print(f"[Warning] Failed to save {DATA_FILE}: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _write(self):
+        with DATA_LOCK:
+            snap = _snapshot(self._data)
+            snap["journal_seq"] = JOURNAL["seq"]
+            _seal_journal()
+        write_json_atomic(DATA_FILE, to_json_data(snap), backups=SAVE_BACKUPS)
+        self.writes += 1
+        if os.path.exists(JOURNAL_SEALED):
+            os.remove(JOURNAL_SEALED)
+
+# --- Rollup cache ---
+
+def load_rollup_cache(path=None):
+    """Return {habit: {"fp", "week", "month", "year"}} from the cache file ({} if missing/bad)."""
+    try:
+        with open(path or ROLLUP_FILE, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        return raw if isinstance(raw, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def save_rollup_cache(d, cache, path=None):
+    """Fold the rollups built this session into `cache` and write it (only if something changed)."""
+    with DATA_LOCK:
+        out = {n: c for n, c in cache.items() if n in d["habits"]}
+        for name, h in d["habits"].items():
+            days = h["days"]
+            if days.rollup is not None and not h.get("partial"):
+                out[name] = {"fp": days.fingerprint(), **days.rollup.to_json()}
+    if out != cache:
+        write_json_atomic(path or ROLLUP_FILE, out, indent=None)
+        cache.clear()
+        cache.update(out)
+
+# --- Storage backends ---
+
+class JsonStorage:
+    """habits.json snapshot plus the append-only journal (the default backend)."""
+
+    def __init__(self):
+        self.saver = SaveService()
+
+    def load(self):
+        return load_json_data()
+
+    def record(self, op, d):
+        """Append `op` to the journal and fsync it, so a mark survives a crash right after it."""
+        if not JOURNAL_MODE:
+            self.saver.request(d)
+            return
+        with open(JOURNAL_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(op, ensure_ascii=False, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.getsize(JOURNAL_FILE) > JOURNAL_COMPACT_BYTES:
+            self.saver.request(d)  # every snapshot write also folds the journal
+
+    def save(self, d):
+        self.saver.request(d)
+
+    def close(self):
+        self.saver.flush()
+
+def _put_day(h, ds, mood, done):
+    """Store one database row into a habit dict."""
+    if done or mood:
+        h["days"].set(ds, mood)
+
+class SqliteStorage:
+    """habits.db via sqlite3: one row per (habit, day), so a mark is a single-row UPSERT.
+
+    Startup only reads the habit list plus the last SQLITE_PRELOAD_DAYS days;
+    such habits carry "partial": True until get_habit() loads the rest.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS habits (
+        name TEXT PRIMARY KEY,
+        last TEXT
+    );
+    CREATE TABLE IF NOT EXISTS days (
+        habit TEXT NOT NULL,
+        day   TEXT NOT NULL,              -- ISO YYYY-MM-DD, sorts like a date
+        mood  TEXT,
+        done  INTEGER NOT NULL DEFAULT 1,
+        PRIMARY KEY (habit, day)          -- per-habit range scans: report, trend, calendar, streak
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS days_by_day ON days (day);   -- startup window across all habits
+    CREATE TABLE IF NOT EXISTS meta (
+        key   TEXT PRIMARY KEY,
+        value TEXT
+    );
+    """
+
+    def __init__(self, path=None):
+        self.path = path or DB_FILE
+        self.db = None
+
+    def _connect(self):
+        if self.db is None:
+            self.db = sqlite3.connect(self.path)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.executescript(self.SCHEMA)
+        return self.db
+
+    def load(self):
+        if not os.path.exists(self.path) and os.path.exists(DATA_FILE):
+            n = migrate_json_to_sqlite(DATA_FILE, self.path)
+            print(f"[Info] Migrated {DATA_FILE} into {self.path} ({n} day rows)")
+        db = self._connect()
+        d = {"habits": {}, "recent": RecentLog()}
+        for name, last in db.execute("SELECT name, last FROM habits ORDER BY rowid"):
+            d["habits"][name] = {"days": HabitHistory(), "last": last, "partial": True}
+        since = (date.today() - timedelta(days=SQLITE_PRELOAD_DAYS - 1)).isoformat()
+        for name, ds, mood, done in db.execute(
+                "SELECT habit, day, mood, done FROM days WHERE day >= ? ORDER BY day", (since,)):
+            if name in d["habits"]:
+                _put_day(d["habits"][name], ds, mood, done)
+        row = db.execute("SELECT value FROM meta WHERE key = 'recent'").fetchone()
+        if row:
+            d["recent"] = RecentLog.from_json(json.loads(row[0]))
+        return d
+
+    def fill_habit(self, name, h):
+        """Load the full history of a partial habit in place."""
+        h["days"] = HabitHistory()
+        for ds, mood, done in self._connect().execute(
+                "SELECT day, mood, done FROM days WHERE habit = ? ORDER BY day", (name,)):
+            _put_day(h, ds, mood, done)
+        h.pop("partial", None)
+
+    def range(self, name, s, e):
+        """Return {iso_day: mood or None} for completed days of `name` within [s, e]."""
+        rows = self._connect().execute(
+            "SELECT day, mood FROM days WHERE habit = ? AND day BETWEEN ? AND ? AND (done OR mood IS NOT NULL)",
+            (name, s.isoformat(), e.isoformat()))
+        return dict(rows)
+
+    def counts(self, name, s, e):
+        """(completed days, {mood: days}) for `name` within [s, e] via one grouped range scan."""
+        moods = {k: 0 for k, _ in MOOD_OPTIONS}
+        done = 0
+        for mood, n in self._connect().execute(
+                "SELECT mood, COUNT(*) FROM days WHERE habit = ? AND day BETWEEN ? AND ? "
+                "AND (done OR mood IS NOT NULL) GROUP BY mood", (name, s.isoformat(), e.isoformat())):
+            done += n
+            if mood in moods:
+                moods[mood] = n
+        return done, moods
+
+    def streak(self, name, today):
+        """Consecutive completed days ending at `today`, newest-first index walk."""
+        n = 0
+        cur = today
+        for (ds,) in self._connect().execute(
+                "SELECT day FROM days WHERE habit = ? AND day <= ? AND (done OR mood IS NOT NULL) "
+                "ORDER BY day DESC", (name, today.isoformat())):
+            if ds != cur.isoformat():
+                break
+            n += 1
+            cur -= timedelta(days=1)
+        return n
+
+    def _put_recent(self, d):
+        self.db.execute(
+            "INSERT INTO meta (key, value) VALUES ('recent', ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (json.dumps(d["recent"].to_json(), ensure_ascii=False, separators=(",", ":")),))
+
+    def record(self, op, d):
+        db = self._connect()
+        kind, name = op.get("op"), op.get("h")
+        with db:
+            if kind in ("add", "set"):
+                db.execute(
+                    "INSERT INTO habits (name, last) VALUES (?, ?) "
+                    "ON CONFLICT (name) DO UPDATE SET last = excluded.last", (name, op["m"]))
+                db.execute(
+                    "INSERT INTO days (habit, day, mood, done) VALUES (?, ?, ?, 1) "
+                    "ON CONFLICT (habit, day) DO UPDATE SET mood = excluded.mood, done = 1",
+                    (name, op["d"], op["m"]))
+            elif kind == "clear":
+                db.execute("DELETE FROM days WHERE habit = ? AND day = ?", (name, op["d"]))
+                h = d["habits"].get(name) or {}
+                db.execute("UPDATE habits SET last = ? WHERE name = ?", (h.get("last"), name))
+            elif kind == "del":
+                db.execute("DELETE FROM days WHERE habit = ?", (name,))
+                db.execute("DELETE FROM habits WHERE name = ?", (name,))
+            if kind != "add":
+                self._put_recent(d)
+
+    def write_all(self, d):
+        """Replace the database contents with data dict `d` (partial habits keep their rows)."""
+        db = self._connect()
+        rows = 0
+        with db:
+            keep = set(d["habits"])
+            for (name,) in db.execute("SELECT name FROM habits").fetchall():
+                if name not in keep:
+                    db.execute("DELETE FROM days WHERE habit = ?", (name,))
+                    db.execute("DELETE FROM habits WHERE name = ?", (name,))
+            for name, h in d["habits"].items():
+                db.execute(
+                    "INSERT INTO habits (name, last) VALUES (?, ?) "
+                    "ON CONFLICT (name) DO UPDATE SET last = excluded.last", (name, h.get("last")))
+                if h.get("partial"):
+                    continue
+                db.execute("DELETE FROM days WHERE habit = ?", (name,))
+                days = [(name, d.isoformat(), m, 1) for d, m in h["days"].items()]
+                db.executemany("INSERT INTO days (habit, day, mood, done) VALUES (?, ?, ?, ?)", days)
+                rows += len(days)
+            self._put_recent(d)
+        return rows
+
+    def save(self, d):
+        with DATA_LOCK:
+            self.write_all(d)
+
+    def close(self):
+        if self.db is not None:
+            self.db.commit()
+            self.db.close()
+            self.db = None
+
+def migrate_json_to_sqlite(json_path=None, db_path=None):
+    """One-shot copy of habits.json (plus any journal) into a SQLite database; return day rows written.
+
+    The database is built as <db>.tmp and renamed into place only once it is
+    complete, so an interrupted migration leaves no half-filled habits.db
+    behind and the next start simply migrates again.
+    """
+    db_path = db_path or DB_FILE
+    tmp = db_path + ".tmp"
+    for p in (tmp, tmp + "-wal", tmp + "-shm"):
+        if os.path.exists(p):
+            os.remove(p)        # left over from an earlier attempt
+    st = SqliteStorage(tmp)
+    try:
+        rows = st.write_all(load_json_data(json_path))
+        st.db.execute("PRAGMA journal_mode=DELETE")     # fold the WAL into the file before the rename
+    finally:
+        st.close()
+    os.replace(tmp, db_path)
+    return rows
+
+def make_storage(kind=None):
+    """Return the storage backend named by `kind` (default: STORAGE_BACKEND)."""
+    if (kind or STORAGE_BACKEND) == "sqlite":
+        return SqliteStorage()
+    return JsonStorage()
@@ -8,6 +8,8 @@
 #     A simple habit & mood tracker with a Tkinter GUI.
 #     Uses only Python's standard library (tkinter, json, datetime, etc.).
 #     Data is saved to `habits.json` in the same folder.
+#     Data, storage and reports live in the `dailyflow` package
+#     (also usable headless: python3 -m dailyflow --help).
 #
 # Ed:
 #     ⚠️ Ed's online environment cannot display GUI windows.
@@ -15,18 +17,32 @@
 #         python3 main.py
 # =========================================================
 
-# Unified date format
-DATE_FMT = "%d-%m-%Y"
-
 import tkinter as tk                    # 导入 Tkinter（标准库 GUI）
 from tkinter import ttk                 # 引入 ttk，自定义按钮样式（便于改背景色）
-import os                               # 文件与路径操作
-import json                             # 读写 JSON
 import random                           # 随机选择一句鼓励语
 from datetime import date, timedelta, datetime    # 日期、时间间隔、时间戳
 from tkinter import messagebox          # 弹出提示/确认
 from tkinter import font as tkfont      # 字体选择
+from tkinter import filedialog          # 选择导入文件
 import calendar
+from collections import Counter, OrderedDict
+import time
+import os
+import threading
+
+# Data, storage and reports live in the Tk-free `dailyflow` package
+from dailyflow.model import (
+    DATE_FMT, MOOD_OPTIONS, MOOD_ICON,
+    today_str, parse_date, fmt_date_obj, daterange,
+)
+from dailyflow.core import (
+    DATA, init_data, record_op, list_habits, get_habit, habit_shell,
+    habit_range, habit_counts, habit_rollups, is_done, compute_streak, CHANGE_HOOKS,
+)
+from dailyflow.reports import EXPORT_FORMATS, report_lines, export_lines, report_filename, write_lines
+from dailyflow.export import export_bulk, format_stats
+from dailyflow.importer import import_file, format_import_stats
+from dailyflow.analytics import FEATURES, co_matrix, rolling_rate
 
 # -----------------------------
 # Colors (keep original palette)
@@ -50,18 +66,8 @@ COLORS = {
 }
 
 # -----------------------------
-# Mood options
+# Mood colors (options and icons: dailyflow.model)
 # -----------------------------
-MOOD_OPTIONS = [
-    ("happy",    "😊"),
-    ("neutral",  "😐"),
-    ("tired",    "😪"),
-    ("stressed", "😰"),
-]
-MOOD_ICON = {}
-for k, v in MOOD_OPTIONS:
-    MOOD_ICON[k] = v
-
 # Unified Morandi mood colors for dots, trend, and calendar
 MOOD_COLOR = {
     "happy":    COLORS["btn_card_bg"],  # soft green (theme)
@@ -101,130 +107,8 @@ BI_MOTIVATIONS = [
     "Focus on the next small action 🎯",
 ]
 
-# -----------------------------
-# Data persistence
-# -----------------------------
-DATA_FILE = "habits.json"
-DATA = {"habits": {}, "recent": []}       # + recent log: list of {dt, habit, mood}
 SELECTED = {"habit": None}  # currently selected habit name
 
-def load_data():
-    """Load data from JSON file."""
-    if not os.path.exists(DATA_FILE):
-        return {"habits": {}, "recent": []}
-    try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            d = json.load(f)
-            if isinstance(d, dict):
-                if "habits" not in d or not isinstance(d["habits"], dict):
-                    d["habits"] = {}
-                if "recent" not in d or not isinstance(d["recent"], list):
-                    d["recent"] = []
-                # 兼容旧数据：为所有习惯补上 done 字段
-                for h in d.get("habits", {}).values():
-                    if isinstance(h, dict):
-                        h.setdefault("done", {})
-                return d
-    except Exception as e:
-        print(f"[Warning] Failed to load habits.json: {e}")
-    return {"habits": {}, "recent": []}
-
-def save_data():
-    """Save data to JSON file."""
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(DATA, f, ensure_ascii=False, indent=2)
-
-def today_str():
-    """Return today's date in YYYY-MM-DD."""
-    return date.today().isoformat()
-
-def parse_date(s):
-    """Parse 'YYYY-MM-DD' or 'DD-MM-YYYY' (trims spaces). Return date or None."""
-    try:
-        s = (s or "").strip()
-        parts = s.split("-")
-        if len(parts) != 3:
-            return None
-        a, b, c = (p.strip() for p in parts)
-        # try YYYY-MM-DD first
-        if len(a) == 4 and a.isdigit() and b.isdigit() and c.isdigit():
-            y, m, d = int(a), int(b), int(c)
-        else:
-            # try DD-MM-YYYY
-            if not (a.isdigit() and b.isdigit() and c.isdigit() and len(c) == 4):
-                return None
-            d, m, y = int(a), int(b), int(c)
-        return date(y, m, d)
-    except Exception:
-        return None
-
-def fmt_date_obj(d):
-    """Format a date object as DD-MM-YYYY for display."""
-    try:
-        return d.strftime(DATE_FMT)
-    except Exception:
-        return "--"
-
-def fmt_date_iso(iso_s):
-    """Format an ISO date string YYYY-MM-DD as DD-MM-YYYY for display."""
-    d = parse_date(iso_s)
-    return d.strftime(DATE_FMT) if d else iso_s
-
-def daterange(d1, d2):
-    """Return list of days [d1..d2]."""
-    out = []
-    cur = d1
-    while cur <= d2:
-        out.append(cur)
-        cur += timedelta(days=1)
-    return out
-
-def ensure_habit(name):
-    """Create habit shell if not exists."""
-    if name not in DATA["habits"]:
-        DATA["habits"][name] = {"history": {}, "last": None, "done": {}}
-    else:
-        # 兼容旧数据：没有 done 字段就补一个
-        DATA["habits"][name].setdefault("done", {})
-
-def list_habits():
-    return list(DATA["habits"].keys())
-
-def get_habit(name):
-    return DATA["habits"].get(name)
-
-def is_done(h, ds):
-    """今天是否完成？优先看 done[ds]；没有则兼容旧数据：history 里有 mood 也算完成。"""
-    if not h:
-        return False
-    if h.get("done", {}).get(ds):
-        return True
-    return ds in h.get("history", {})
-
-def compute_streak(name):
-    """Count consecutive days from today backwards (based on 'done')."""
-    h = get_habit(name)
-    if not h:
-        return 0
-    s = 0
-    cur = date.today()
-    while is_done(h, cur.isoformat()):
-        s += 1
-        cur -= timedelta(days=1)
-    return s
-
-# --- Recent log helpers ---
-def push_recent(habit, mood):
-    """Append a newest action to recent list, keep at most 50, and drop removed habits."""
-    DATA.setdefault("recent", [])
-    DATA["recent"].insert(0, {
-        "dt": datetime.now().isoformat(timespec="seconds"),
-        "habit": habit,
-        "mood": mood,
-    })
-    # remove entries whose habit was deleted, then cap length to 50
-    DATA["recent"] = [r for r in DATA["recent"] if r.get("habit") in DATA["habits"]][:50]
-
 # ===================== GUI =====================
 
 # 创建主窗口
@@ -449,137 +333,256 @@ right_selected = tk.Frame(right, bg=COLORS["main_bg"])
 right_selected.pack(fill="x", padx=2, pady=(0, 10))
 
 
-# --------- Right panel helper functions ---------
-def _clear_children(frame):
-    for w in frame.winfo_children():
-        w.destroy()
+# --------- Mood icons ---------
+# The mood icons on canvases are PNGs under assets/moods (rendered from the emoji
+# by tools/render_mood_glyphs.py), one per mood and "—" at each font size the
+# emoji text used. Each is loaded once into a PhotoImage and drawn with
+# create_image, so Tk never shapes emoji text while redrawing. Their canvas items
+# are created once and reused; set_mood_icon only swaps an item's image when its
+# mood differs.
+GLYPH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "moods")
+GLYPHS = {}                 # (mood, size) -> PhotoImage
+REDRAW_SKIP = {"on": True}  # skip unchanged icons / cards; bench_redraws() turns it off to compare
+BENCH_REDRAWS = 200         # redraws per benchmark run
+
+def mood_glyph(mood, size):
+    """The cached PhotoImage of `mood` at font size 10, 12 or 14 (None / unknown = "—")."""
+    key = (mood if mood in MOOD_ICON else None, size)
+    img = GLYPHS.get(key)
+    if img is None:
+        path = os.path.join(GLYPH_DIR, f"{key[0] or 'none'}_{size}.png")
+        img = GLYPHS[key] = tk.PhotoImage(file=path)
+    return img
+
+def set_mood_icon(cv, item, mood, size, shown, **kw):
+    """Show `mood`'s glyph ("—" for none) on image `item`; `shown` maps item -> current glyph."""
+    img = mood_glyph(mood, size)
+    if shown.get(item) is not img or not REDRAW_SKIP["on"]:
+        shown[item] = img
+        kw["image"] = img
+    if kw:
+        cv.itemconfig(item, **kw)
+
+def bench_glyphs(n=BENCH_REDRAWS * 10):
+    """Time n mood icons drawn as emoji text (create_text) against n drawn as cached glyphs (create_image)."""
+    cv = tk.Canvas(root, width=400, height=400)
+    cv.place(x=0, y=0)          # on screen, so update_idletasks() really draws
+    moods = [m for m, _ in MOOD_OPTIONS] + [None]
+    lines = [f"{n} mood icons, ms per 1000"]
+    for label, draw in (
+        ("emoji text", lambda i, m: cv.create_text(i * 13 % 390, i // 30 * 13 % 390,
+                                                   text=MOOD_ICON.get(m, "—"), font=("Arial", 14))),
+        ("PNG glyph", lambda i, m: cv.create_image(i * 13 % 390, i // 30 * 13 % 390,
+                                                  image=mood_glyph(m, 14))),
+    ):
+        draw(0, None)
+        cv.update_idletasks()
+        cv.delete("all")
+        t0 = time.perf_counter()
+        for i in range(n):
+            draw(i, moods[i % len(moods)])
+        cv.update_idletasks()
+        lines.append(f"{label}: {(time.perf_counter() - t0) * 1e6 / n:.2f}")
+        cv.delete("all")
+    cv.destroy()
+    return "\n".join(lines)
+
+def bench_redraws(draws, n=BENCH_REDRAWS):
+    """Time n calls of each redraw in `draws` ({label: fn}) with the skip off, then on.
 
+    Every call is followed by update_idletasks(), so the repaint of the (visible)
+    widgets is inside the timing; run it with the views on screen (F11).
+    """
+    lines = [f"{n} redraws each, ms per redraw without → with the skip"]
+    try:
+        for label, draw in draws.items():
+            ms = []
+            for skip in (False, True):
+                REDRAW_SKIP["on"] = skip
+                draw()                  # warm-up: brings every item up to date
+                root.update_idletasks()
+                t0 = time.perf_counter()
+                for _ in range(n):
+                    draw()
+                    root.update_idletasks()
+                ms.append((time.perf_counter() - t0) * 1000 / n)
+            lines.append(f"{label}: {ms[0]:.2f} → {ms[1]:.2f}")
+    finally:
+        REDRAW_SKIP["on"] = True
+    return "\n".join(lines)
+
+# --------- Right panel (built once, refreshed in place) ---------
 def _mini_progress(done, total):
     # Build a 10-cell mini bar string
     fill = int(round((done / total) * 10)) if total else 0
     return "■" * fill + "·" * (10 - fill)
 
-def refresh_right_panel():
-    # --- Today Summary ---
-    _clear_children(right_summary)
-    tk.Label(
-        right_summary, text="🌿 Today Summary",
-        bg=COLORS["main_bg"], fg=COLORS["title_fg"], font=("Arial", 12, "bold")
-    ).pack(anchor="w")
-
+RECENT_SHOWN = 5    # rows in the Recent Activity section
+
+# --- Today Summary ---
+tk.Label(
+    right_summary, text="🌿 Today Summary",
+    bg=COLORS["main_bg"], fg=COLORS["title_fg"], font=("Arial", 12, "bold")
+).pack(anchor="w")
+summary_lbl = tk.Label(right_summary, bg=COLORS["main_bg"], fg=COLORS["hint_fg"], font=("Arial", 11))
+summary_lbl.pack(anchor="w", pady=(2, 0))
+
+# --- Recent Activity (last 5) ---
+tk.Label(
+    right_activity, text="📅 Recent Activity",
+    bg=COLORS["main_bg"], fg=COLORS["title_fg"], font=("Arial", 12, "bold")
+).pack(anchor="w")
+activity_lbls = [tk.Label(right_activity, bg=COLORS["main_bg"], fg=COLORS["hint_fg"], font=("Arial", 11))
+                 for _ in range(RECENT_SHOWN)]
+activity_none = tk.Label(
+    right_activity, text="(no recent activity)",
+    bg=COLORS["main_bg"], fg=COLORS["hint_fg"], font=("Arial", 10)
+)
+ACTIVITY = {"shown": None}      # rows currently packed
+
+# --- Selected Habit · Last 7 days ---
+dots_title = tk.Label(right_selected, bg=COLORS["main_bg"], fg=COLORS["title_fg"], font=("Arial", 12, "bold"))
+dots_title.pack(anchor="w")
+dots_hint = tk.Label(
+    right_selected, text="(tap a card on the left to select)",
+    bg=COLORS["main_bg"], fg=COLORS["hint_fg"], font=("Arial", 10)
+)
+# small canvas for 7-day dots: 7 ovals + 7 mood glyphs, re-coloured on refresh
+dots_cv = tk.Canvas(right_selected, width=220, height=52, bg=COLORS["main_bg"],
+                    highlightthickness=0)
+dots_done = tk.Label(right_selected, bg=COLORS["main_bg"], fg=COLORS["hint_fg"], font=("Arial", 10))
+DOT_ITEMS = []
+for _i in range(7):
+    _x, _y, _r = 14 + _i * 30, 20, 6
+    DOT_ITEMS.append((dots_cv.create_oval(_x - _r, _y - _r, _x + _r, _y + _r, width=1),
+                      # put the mood glyph under the dot (small)
+                      dots_cv.create_image(_x, _y + 16, image=mood_glyph(None, 10))))
+DOTS = {"mode": None}           # "hint" or "dots": which widgets are packed
+DOT_ICONS = {}                  # glyph item -> image shown (see set_mood_icon)
+
+def _draw_summary():
     names = list_habits()
     today = today_str()
     done = 0
     for n in names:
-        h = get_habit(n)
+        h = habit_shell(n)
         if h and is_done(h, today):
             done += 1
     total = len(names)
-    bar = _mini_progress(done, total)
-    tk.Label(
-        right_summary,
-        text=f"{bar}  {done}/{total} habits",
-        bg=COLORS["main_bg"], fg=COLORS["hint_fg"], font=("Arial", 11)
-    ).pack(anchor="w", pady=(2, 0))
-
-    # --- Recent Activity (last 5) ---
-    _clear_children(right_activity)
-    tk.Label(
-        right_activity, text="📅 Recent Activity",
-        bg=COLORS["main_bg"], fg=COLORS["title_fg"], font=("Arial", 12, "bold")
-    ).pack(anchor="w")
+    summary_lbl.config(text=f"{_mini_progress(done, total)}  {done}/{total} habits")
 
+def _draw_activity():
     # gather last 5 marks using the recent log (already newest-first)
     events = []
-    for r in DATA.get("recent", []):
-        nm = r.get("habit")
+    for dt_str, nm, mood in DATA["recent"]:
         if nm in DATA.get("habits", {}):
-            events.append((r.get("dt", ""), nm, r.get("mood")))
-    shown = 0
-    for dt_str, n, mood in events[:5]:
+            events.append((dt_str or "", nm, mood))
+            if len(events) == RECENT_SHOWN:
+                break
+    for lbl, (dt_str, n, mood) in zip(activity_lbls, events):
         # 显示 DD-MM
         d = parse_date(dt_str[:10]) if dt_str else None
         day_txt = d.strftime('%d-%m') if d else "--"
 
         # Show a friendly label for a clear action; otherwise show the mood emoji
         if mood == "cleared":
-            emoji = "🧽"
-            tail  = "clear"
+            txt = f"{day_txt}  {n}  🧽 clear"
         else:
-            emoji = MOOD_ICON.get(mood, "—")
-            tail  = ""
-
-        txt = f"{day_txt}  {n}  {emoji}"
-        if tail:
-            txt += f" {tail}"
-
-        tk.Label(
-            right_activity,
-            text=txt,
-            bg=COLORS["main_bg"], fg=COLORS["hint_fg"], font=("Arial", 11)
-        ).pack(anchor="w")
-        shown += 1
-    if shown == 0:
-        tk.Label(
-            right_activity, text="(no recent activity)",
-            bg=COLORS["main_bg"], fg=COLORS["hint_fg"], font=("Arial", 10)
-        ).pack(anchor="w")
-
-    # --- Selected Habit · Last 7 days ---
-    _clear_children(right_selected)
+            txt = f"{day_txt}  {n}  {MOOD_ICON.get(mood, '—')}"
+        lbl.config(text=txt)
+    # re-pack only when the number of rows changes
+    shown = len(events)
+    if shown != ACTIVITY["shown"]:
+        ACTIVITY["shown"] = shown
+        for w in activity_lbls + [activity_none]:
+            w.pack_forget()
+        for lbl in activity_lbls[:shown]:
+            lbl.pack(anchor="w")
+        if shown == 0:
+            activity_none.pack(anchor="w")
+
+def _draw_dots():
     sel = SELECTED.get("habit")
+    h = habit_shell(sel) if sel else None
     # Right panel section title uses the new name
-    title_text = f"📊 7-Day Mood Dots — {sel}" if sel else "📊 7-Day Mood Dots"
-    tk.Label(
-        right_selected, text=title_text,
-        bg=COLORS["main_bg"], fg=COLORS["title_fg"], font=("Arial", 12, "bold")
-    ).pack(anchor="w")
-
-    if not sel:
-        tk.Label(
-            right_selected, text="(tap a card on the left to select)",
-            bg=COLORS["main_bg"], fg=COLORS["hint_fg"], font=("Arial", 10)
-        ).pack(anchor="w")
-        return
-
-    h = get_habit(sel)
+    dots_title.config(text=f"📊 7-Day Mood Dots — {sel}" if sel else "📊 7-Day Mood Dots")
+    mode = "dots" if h else "hint"
+    if mode != DOTS["mode"]:
+        DOTS["mode"] = mode
+        for w in (dots_hint, dots_cv, dots_done):
+            w.pack_forget()
+        if h:
+            dots_cv.pack(anchor="w", pady=(2, 0))
+            dots_done.pack(anchor="w", pady=(2, 0))
+        else:
+            dots_hint.pack(anchor="w")
     if not h:
         return
-    e = date.today()
-    s = e - timedelta(days=6)
-    days = daterange(s, e)
-    by = h["history"]
 
-
-    # small canvas for 7-day dots
-    cv = tk.Canvas(right_selected, width=220, height=52, bg=COLORS["main_bg"],
-                   highlightthickness=0)
-    cv.pack(anchor="w", pady=(2, 0))
-
-    x0 = 14
-    step = 30
-    y0 = 20
+    e = date.today()
     done7 = 0
-    for i, d in enumerate(days):
-        ds = d.isoformat()
-        m = by.get(ds)
-        if is_done(h, ds):
+    for (oval, emo), d in zip(DOT_ITEMS, daterange(e - timedelta(days=6), e)):
+        m = h["days"].mood(d)
+        if is_done(h, d):
             done7 += 1
-        x = x0 + i * step
-        r = 6
-        fill = MOOD_COLOR.get(m, COLORS["dot_empty"])
-        outline = MOOD_OUTLINE.get(m, MOOD_OUTLINE[None])
-        cv.create_oval(x - r, y0 - r, x + r, y0 + r, fill=fill, outline=outline, width=1)
-        # put emoji under the dot (small)
-        cv.create_text(x, y0 + 16, text=MOOD_ICON.get(m, "—"), font=("Arial", 10))
-
-    tk.Label(
-        right_selected, text=f"({done7}/7 days complete)",
-        bg=COLORS["main_bg"], fg=COLORS["hint_fg"], font=("Arial", 10)
-    ).pack(anchor="w", pady=(2, 0))
-
+        dots_cv.itemconfig(oval, fill=MOOD_COLOR.get(m, COLORS["dot_empty"]),
+                           outline=MOOD_OUTLINE.get(m, MOOD_OUTLINE[None]))
+        set_mood_icon(dots_cv, emo, m, 10, DOT_ICONS)
+    dots_done.config(text=f"({done7}/7 days complete)")
+
+# --------- Refresh scheduler ---------
+# Callers mark regions dirty; one after_idle pass per event-loop turn redraws
+# each dirty region once, however many times it was asked for.
+REFRESH_REGIONS = ("cards", "summary", "activity", "dots", "tip")    # redraw order
+REFRESH_DRAW = {
+    "cards": lambda: render_cards(),
+    "summary": _draw_summary,
+    "activity": _draw_activity,
+    "dots": _draw_dots,
+    "tip": set_random_tip,
+}
+REFRESH = {"dirty": set(), "pending": None}
+REFRESH_STATS = {"passes": 0, "requested": Counter(), "drawn": Counter(), "seconds": Counter()}
+
+def request_refresh(*regions):
+    """Mark `regions` dirty (default: all but the tip) and schedule one idle redraw pass."""
+    regions = regions or REFRESH_REGIONS[:-1]
+    REFRESH["dirty"].update(regions)
+    REFRESH_STATS["requested"].update(regions)
+    if REFRESH["pending"] is None:
+        REFRESH["pending"] = root.after_idle(_run_refresh)
+
+def _run_refresh():
+    REFRESH["pending"] = None
+    dirty, REFRESH["dirty"] = REFRESH["dirty"], set()
+    REFRESH_STATS["passes"] += 1
+    for region in REFRESH_REGIONS:
+        if region in dirty:
+            t0 = time.perf_counter()
+            REFRESH_DRAW[region]()
+            REFRESH_STATS["seconds"][region] += time.perf_counter() - t0
+            REFRESH_STATS["drawn"][region] += 1
+
+def refresh_stats_text():
+    """How many region redraws were asked for, done, and saved by coalescing (with mean ms per redraw)."""
+    req, drawn, secs = REFRESH_STATS["requested"], REFRESH_STATS["drawn"], REFRESH_STATS["seconds"]
+    asked, done = sum(req.values()), sum(drawn.values())
+    per = "\n".join(f"{r}: {drawn[r]}/{req[r]} drawn, {secs[r] / drawn[r] * 1000:.2f} ms each"
+                    for r in REFRESH_REGIONS if drawn[r])
+    return (f"{REFRESH_STATS['passes']} passes, {done} redraws for {asked} requests "
+            f"({asked - done} coalesced)\n{per}")
+
+root.bind("<F12>", lambda _=None: notify_dialog("Refresh stats", refresh_stats_text(), icon="⏱"))
+root.bind("<F11>", lambda _=None: notify_dialog("Redraw benchmark", bench_redraws({
+    "cards": lambda: [update_card(name) for name in list(CARDS)],
+    "7-day dots": _draw_dots,
+}) + "\n\n" + bench_glyphs(), icon="⏱"))
+
+
+# Cards area (scrollable, virtualized: only rows near the viewport have widgets)
+CARD_ROW_H = 128        # px per habit row: the card plus its 10px top/bottom margin
+CARD_OVERSCAN = 3       # rows kept materialized above and below the viewport
 
-# Cards area (scrollable)
 cards_outer = tk.Frame(left_wrap, bg=COLORS["sidebar_bg"])
 cards_outer.pack(fill="both", expand=True, padx=4, pady=4)
 
@@ -588,21 +591,28 @@ cards_canvas.pack(side="left", fill="both", expand=True)
 
 cards_scroll = tk.Scrollbar(cards_outer, orient="vertical", command=cards_canvas.yview)
 cards_scroll.pack(side="right", fill="y")
-cards_canvas.configure(yscrollcommand=cards_scroll.set)
 
-cards_frame = tk.Frame(cards_canvas, bg=COLORS["sidebar_bg"])
-canvas_window = cards_canvas.create_window((0, 0), window=cards_frame, anchor="nw")
+def _on_cards_yscroll(first, last):
+    cards_scroll.set(first, last)
+    render_visible_cards()
 
-def _update_scrollregion(_=None):
-    """Refresh scroll region."""
-    cards_canvas.configure(scrollregion=cards_canvas.bbox("all"))
+cards_canvas.configure(yscrollcommand=_on_cards_yscroll)
 
-# 绑定内部 Frame 大小变化，更新滚动范围
-cards_frame.bind("<Configure>", _update_scrollregion)
+def _update_scrollregion(_=None):
+    """Refresh scroll region from the row count (no bbox walk over the items)."""
+    h = len(CARD_ORDER) * CARD_ROW_H
+    cards_canvas.configure(scrollregion=(0, 0, cards_canvas.winfo_width(), max(h, 1)))
 
-# Keep inner frame width equal to canvas width, so cards stretch full row
+# Keep every row as wide as the canvas, so cards stretch full row
 def _sync_inner_width(_=None):
-    cards_canvas.itemconfig(canvas_window, width=cards_canvas.winfo_width())
+    w = cards_canvas.winfo_width()
+    for slot in CARDS.values():
+        cards_canvas.itemconfig(slot["win"], width=w)
+    for slot in CARD_POOL:
+        cards_canvas.itemconfig(slot["win"], width=w)
+    cards_canvas.coords(cards_empty, w // 2, 8)
+    _update_scrollregion()
+    render_visible_cards()
 cards_canvas.bind("<Configure>", _sync_inner_width)
 
 
@@ -879,13 +889,9 @@ def add_habit_dialog():
             warn_dialog("This habit already exists.")
             return
         mood = mood_var.get()
-        ensure_habit(name)
-        DATA["habits"][name]["history"][today_str()] = mood
-        DATA["habits"][name]["last"] = mood
-        DATA["habits"][name].setdefault("done", {})[today_str()] = True
-        save_data()
+        record_op({"op": "add", "h": name, "d": today_str(), "m": mood})
         top.destroy()
-        render_cards()
+        request_refresh()
 
     def cancel():
         top.destroy()
@@ -899,8 +905,15 @@ def add_habit_dialog():
     tk.Button(bar, text="OK", bg=COLORS["btn_toolbar_bg"], fg=COLORS["btn_toolbar_fg"], command=ok).pack(side="left", padx=6)
     tk.Button(bar, text="Cancel", command=cancel).pack(side="left", padx=6)
 
-def range_dialog(title_text, default_days, allow_last=True, limit_days=None):
-    """Return (habit, start, end) or (None, None, None)."""
+ALL_HABITS = "(all habits)"
+
+EXPORT = {"fmt": "txt"}   # last format picked in the Export dialog
+
+def range_dialog(title_text, default_days, allow_last=True, limit_days=None, allow_all=False, pick_format=False):
+    """Return (habit, start, end) or (None, None, None); habit may be ALL_HABITS if allow_all.
+
+    With pick_format the dialog also shows a Format row and stores the choice in EXPORT["fmt"].
+    """
     # 统一的时间范围弹窗；可限制最大天数，并禁选未来日期
     top = tk.Toplevel(root)
     top.title(title_text)
@@ -923,7 +936,7 @@ def range_dialog(title_text, default_days, allow_last=True, limit_days=None):
         top.destroy()
         return None, None, None
     habit_var = tk.StringVar(value=SELECTED["habit"] or names[0])
-    tk.OptionMenu(card, habit_var, *names).grid(row=1, column=1, sticky="w", padx=8, pady=2)
+    tk.OptionMenu(card, habit_var, *(names + [ALL_HABITS] if allow_all else names)).grid(row=1, column=1, sticky="w", padx=8, pady=2)
 
     tk.Label(card, text="Range:", bg=COLORS["card_bg"]).grid(row=2, column=0, sticky="e", padx=8)
     range_var = tk.StringVar(value="last")
@@ -946,6 +959,11 @@ def range_dialog(title_text, default_days, allow_last=True, limit_days=None):
     ent_s.grid(row=4, column=1, sticky="w", padx=8, pady=(6, 0))
     ent_e.grid(row=5, column=1, sticky="w", padx=8)
 
+    fmt_var = tk.StringVar(value=EXPORT["fmt"])
+    if pick_format:
+        tk.Label(card, text="Format:", bg=COLORS["card_bg"]).grid(row=6, column=0, sticky="e", padx=8, pady=(6, 0))
+        tk.OptionMenu(card, fmt_var, *EXPORT_FORMATS).grid(row=6, column=1, sticky="w", padx=8, pady=(6, 0))
+
     result = {"ok": False, "habit": None, "start": None, "end": None}
 
     def ok():
@@ -968,6 +986,7 @@ def range_dialog(title_text, default_days, allow_last=True, limit_days=None):
                 error_dialog("Invalid", f"Range too long (max {limit_days} days).")
                 return
         result["ok"] = True
+        EXPORT["fmt"] = fmt_var.get()
         result["habit"] = h
         result["start"] = s
         result["end"] = e
@@ -981,7 +1000,7 @@ def range_dialog(title_text, default_days, allow_last=True, limit_days=None):
     top.bind("<Escape>", lambda e=None: cancel())
 
     bar = tk.Frame(card, bg=COLORS["card_bg"])
-    bar.grid(row=6, column=0, columnspan=2, sticky="e", padx=10, pady=(8, 10))
+    bar.grid(row=7, column=0, columnspan=2, sticky="e", padx=10, pady=(8, 10))
     tk.Button(bar, text="Show", bg=COLORS["btn_toolbar_bg"], fg=COLORS["btn_toolbar_fg"], command=ok).pack(side="left", padx=6)
     tk.Button(bar, text="Cancel", command=cancel).pack(side="left", padx=6)
 
@@ -998,33 +1017,7 @@ def do_report():
     habit, s, e = range_dialog("Report", default_days=7, allow_last=True, limit_days=None)
     if not habit:
         return
-    h = get_habit(habit)
-    by = h["history"]
-
-    # Build report text (same content as before)
-    lines = []
-    lines.append(f"Report — {habit}")
-    lines.append(f"Range  — {fmt_date_obj(s)} to {fmt_date_obj(e)}")
-    lines.append("-" * 40)
-    done_cnt = 0
-    counts = {"happy": 0, "neutral": 0, "tired": 0, "stressed": 0}
-    for d in daterange(s, e):
-        ds = d.isoformat()
-        m = by.get(ds)
-        icon = MOOD_ICON.get(m, "—")
-        stamp = "✓" if is_done(h, ds) else "—"
-        lines.append(f"{fmt_date_iso(ds)}: {stamp}  {icon} {m or '—'}")
-        if is_done(h, ds):
-            done_cnt += 1
-        if m in counts:
-            counts[m] += 1
-    lines.append("-" * 40)
-    total = len(daterange(s, e))
-    fill = int(round((done_cnt / total) * 10)) if total else 0
-    bar = "█" * fill + "░" * (10 - fill)
-    lines.append(f"Completion: [{bar}] {done_cnt}/{total} days")
-    lines.append(f"😊 {counts['happy']}  😐 {counts['neutral']}  😪 {counts['tired']}  😰 {counts['stressed']}")
-    report_text = "\n".join(lines)
+    report_text = "\n".join(report_lines(habit, s, e))
 
     # Custom window with Export + Close
     win = tk.Toplevel(root)
@@ -1070,10 +1063,9 @@ def do_report():
 
     def do_export_now():
         # export to a TXT file with an auto name in the current folder
-        fname = f"report_{habit.replace(' ', '_')}_{fmt_date_obj(s)}_to_{fmt_date_obj(e)}.txt"
+        fname = report_filename(habit, s, e)
         try:
-            with open(fname, "w", encoding="utf-8") as f:
-                f.write(report_text + "\n")
+            write_lines(fname, report_lines(habit, s, e))
             notify_dialog("Exported", f"{fname}", icon="📄")
         except Exception as ex:
             error_dialog("Export failed", f"{ex}")
@@ -1090,13 +1082,38 @@ def do_report():
     win.update_idletasks()
     center_on_parent(win, left_wrap, y_bias=-80)
 
+TREND_LOD_DAYS = (120, 1100)    # up to 120 days: daily dots; up to ~3 years: weekly bars; beyond: monthly
+TREND_STEP = {"day": 30, "week": 30, "month": 44}
+TREND_OVERSCAN = 4              # extra buckets kept on each side of the viewport
+
+def trend_buckets(level, s, e):
+    """(label, first day, last day) per bucket of `level` covering [s, e]."""
+    if level == "day":
+        return [(None, d, d) for d in daterange(s, e)]
+    out = []
+    a = s
+    while a <= e:
+        if level == "week":
+            b = min(e, a + timedelta(days=6 - a.weekday()))
+            label = f"W{a.isocalendar()[1]:02d}"
+        else:
+            b = min(e, date(a.year, a.month, calendar.monthrange(a.year, a.month)[1]))
+            label = f"{calendar.month_abbr[a.month]} {a.year % 100:02d}"
+        out.append((label, a, b))
+        a = b + timedelta(days=1)
+    return out
+
 def do_trend():
-    """Show emoji trend (<=60 days) with horizontal scroll."""
-    habit, s, e = range_dialog("Trend", default_days=14, allow_last=True, limit_days=60)
+    """Show the mood trend with horizontal scroll: daily dots, or weekly/monthly bars for long ranges.
+
+    Only the buckets in (or just beside) the viewport have canvas items; they
+    are recycled as the view scrolls, so a 5-year range opens like a 14-day one.
+    """
+    habit, s, e = range_dialog("Trend", default_days=14, allow_last=True, limit_days=None)
     if not habit:
         return
-    h = get_habit(habit)
-    by = h["history"]
+    hist = get_habit(habit)["days"]
+    n_days = (e - s).days + 1
 
     # 趋势弹窗（横向滚动）
     win = tk.Toplevel(root)
@@ -1108,43 +1125,167 @@ def do_trend():
     tk.Label(win, text=f"Mood Trend — {habit}  ({fmt_date_obj(s)} → {fmt_date_obj(e)})",
              bg=COLORS["main_bg"], fg=COLORS["title_fg"], font=("Arial", 13, "bold")).pack(pady=(10, 6))
 
-    days = daterange(s, e)
-    n = len(days)
-    step = 30
-    pad = 24
-    width = pad * 2 + max(0, n - 1) * step + 60
+    auto = "day" if n_days <= TREND_LOD_DAYS[0] else "week" if n_days <= TREND_LOD_DAYS[1] else "month"
+    level_var = tk.StringVar(value=auto)
+    bar = tk.Frame(win, bg=COLORS["main_bg"])
+    bar.pack(padx=12, fill="x")
+    for lv, text in (("day", "Days"), ("week", "Weeks"), ("month", "Months")):
+        tk.Radiobutton(bar, text=text, variable=level_var, value=lv,
+                       bg=COLORS["main_bg"]).pack(side="left")
 
+    pad = 24
+    cv_w, cv_h = 960, 230
     wrap = tk.Frame(win, bg=COLORS["main_bg"])
     wrap.pack(padx=12, pady=10, fill="x")
-
-    cv = tk.Canvas(wrap, width=min(960, width), height=130, bg=COLORS["card_bg"],
+    cv = tk.Canvas(wrap, width=cv_w, height=cv_h, bg=COLORS["card_bg"],
                    highlightthickness=1, highlightbackground=COLORS["border"])
     cv.pack(side="top", fill="x")
-
     xbar = tk.Scrollbar(wrap, orient="horizontal", command=cv.xview)
     xbar.pack(side="top", fill="x")
-    cv.configure(xscrollcommand=xbar.set, scrollregion=(0, 0, width, 130))
 
     x0 = pad
-    y0 = 60
-    done = 0
-    stats = {"happy": 0, "neutral": 0, "tired": 0, "stressed": 0}
-
-    for i, d in enumerate(days):
-        ds = d.isoformat()
-        m = by.get(ds)
-        if m:
-            done += 1
-        if m in stats:
-            stats[m] += 1
-        x = x0 + i * step
-        r = 8  # keep slightly larger radius
-        fill = MOOD_COLOR.get(m, MOOD_COLOR[None])
-        outline = MOOD_OUTLINE.get(m, MOOD_OUTLINE[None])
-        cv.create_oval(x - r, y0 - r, x + r, y0 + r, fill=fill, outline=outline, width=1)
-        cv.create_text(x, y0 + 22, text=MOOD_ICON.get(m, "—"), font=("Arial", 12))
-
-    total = len(days)
+    y0 = 160
+    top, bottom = 28, 120          # y of 100% and 0% for the overlay
+    done, stats = habit_counts(habit, s, e)
+
+    # 滚动完成率 / 开心占比（滑动窗口，O(n)），每天一个值
+    series = []
+    for w, dash, lw in ((7, None, 2), (30, (4, 3), 1)):
+        rate = rolling_rate(habit, s, e, w)
+        happy = rolling_rate(habit, s, e, w, mood="happy")
+        share = [h / r if r else None for h, r in zip(happy, rate)]
+        series.append((f"{w}-day done", rate, MOOD_OUTLINE["neutral"], dash, lw))
+        series.append((f"{w}-day happy share", share, MOOD_OUTLINE["happy"], dash, lw))
+
+    # the legend and the 0/50/100% labels are tagged "pinned" and moved along with the
+    # view on every scroll, so they stay at the left edge of the window
+    st = {"level": None, "buckets": [], "step": 30, "width": 0, "span": None,
+          "slots": [], "lines": [[] for _ in series], "guides": [], "pin_x": 0, "icons": {}}
+
+    def slot_items(level):
+        """Create the canvas items for one bucket slot of `level`."""
+        if level == "day":
+            return (cv.create_oval(0, 0, 0, 0, width=1),
+                    cv.create_image(0, 0, image=mood_glyph(None, 12)))
+        return (cv.create_rectangle(0, 0, 0, 0, outline=COLORS["border"], fill=MOOD_COLOR[None]),
+                cv.create_rectangle(0, 0, 0, 0, outline=""),
+                cv.create_text(0, 0, text="", font=("Arial", 8), fill=COLORS["hint_fg"]))
+
+    def fill_slot(items, i):
+        """Point a recycled slot at bucket i."""
+        label, a, b = st["buckets"][i]
+        x = x0 + i * st["step"]
+        if st["level"] == "day":
+            m = hist.mood(a) if hist.is_done(a) else None
+            r = 8
+            cv.coords(items[0], x - r, y0 - r, x + r, y0 + r)
+            cv.itemconfig(items[0], fill=MOOD_COLOR.get(m, MOOD_COLOR[None]),
+                          outline=MOOD_OUTLINE.get(m, MOOD_OUTLINE[None]), state="normal")
+            cv.coords(items[1], x, y0 + 22)
+            set_mood_icon(cv, items[1], m, 12, st["icons"], state="normal")
+            return
+        d_cnt, moods = hist.counts(a, b)            # O(1) from the prefix sums
+        frac = d_cnt / ((b - a).days + 1)
+        # done days with no mood (e.g. imported) get the heatmap's darker "done" grey
+        top_mood = max(moods, key=moods.get) if any(moods.values()) else None
+        half = st["step"] // 2 - 4
+        y_top, y_bot = y0 - 22, y0 + 22
+        cv.coords(items[0], x - half, y_top, x + half, y_bot)
+        cv.itemconfig(items[0], state="normal")
+        cv.coords(items[1], x - half, y_bot - frac * (y_bot - y_top), x + half, y_bot)
+        cv.itemconfig(items[1], fill=MOOD_COLOR.get(top_mood, MOOD_OUTLINE[None]) if top_mood
+                      else MOOD_OUTLINE[None], state="normal" if d_cnt else "hidden")
+        cv.coords(items[2], x, y_bot + 12)
+        cv.itemconfig(items[2], text=label, state="normal")
+
+    def draw_lines(i0, i1):
+        """Overlay polylines for the visible buckets (one value per bucket: its last day)."""
+        for k, (_, vals, color, dash, lw) in enumerate(series):
+            segs, seg = [], []
+            for i in range(i0, i1):
+                v = vals[(st["buckets"][i][2] - s).days]
+                if v is None:
+                    if seg:
+                        segs.append(seg)
+                    seg = []
+                else:
+                    seg += [x0 + i * st["step"], bottom - v * (bottom - top)]
+            if seg:
+                segs.append(seg)
+            pool = st["lines"][k]
+            for j, pts in enumerate(segs):
+                if len(pts) == 2:
+                    pts = pts + [pts[0] + 1, pts[1]]     # lone point: a 1px stub
+                if j == len(pool):
+                    pool.append(cv.create_line(0, 0, 0, 0, fill=color, width=lw, dash=dash))
+                cv.coords(pool[j], *pts)
+                cv.itemconfig(pool[j], state="normal")
+            for item in pool[len(segs):]:
+                cv.itemconfig(item, state="hidden")
+
+    def render_visible(force=False):
+        nb = len(st["buckets"])
+        left = cv.canvasx(0)
+        right = left + max(cv.winfo_width(), 1)
+        if left != st["pin_x"]:
+            cv.move("pinned", left - st["pin_x"], 0)
+            st["pin_x"] = left
+        i0 = max(0, int((left - x0) / st["step"]) - TREND_OVERSCAN)
+        i1 = min(nb, int((right - x0) / st["step"]) + 2 + TREND_OVERSCAN)
+        if not force and st["span"] == (i0, i1):
+            return
+        st["span"] = (i0, i1)
+        slots = st["slots"]
+        for k, i in enumerate(range(i0, i1)):
+            if k == len(slots):
+                slots.append(slot_items(st["level"]))
+            fill_slot(slots[k], i)
+        for items in slots[max(0, i1 - i0):]:
+            for it in items:
+                cv.itemconfig(it, state="hidden")
+        draw_lines(i0, i1)
+
+    def on_xscroll(first, last):
+        xbar.set(first, last)
+        render_visible()
+
+    def set_level(*_):
+        level = level_var.get()
+        for items in st["slots"]:
+            for it in items:
+                cv.delete(it)
+        st.update(level=level, buckets=trend_buckets(level, s, e), step=TREND_STEP[level],
+                  slots=[], span=None, icons={})
+        nb = len(st["buckets"])
+        st["width"] = max(pad * 2 + max(0, nb - 1) * st["step"] + 60, 540)
+        cv.configure(scrollregion=(0, 0, st["width"], cv_h))
+        for item in st["guides"]:
+            cv.delete(item)
+        st["guides"] = []
+        for frac in (0, 0.5, 1):
+            y = bottom - frac * (bottom - top)
+            st["guides"].append(cv.create_line(0, y, st["width"], y, fill=COLORS["border"], dash=(2, 4)))
+            st["guides"].append(cv.create_text(st["pin_x"] + 4, y - 6, text=f"{int(frac * 100)}%", anchor="w",
+                                               font=("Arial", 7), fill=COLORS["hint_fg"], tags=("pinned",)))
+        for pool in st["lines"]:
+            for item in pool:
+                cv.tag_raise(item)
+        cv.xview_moveto(1.0 if nb * st["step"] > cv_w else 0.0)   # open on the most recent end
+        render_visible(force=True)
+
+    # legend (pinned to the top-left of the window)
+    lx = x0
+    for label, _, color, dash, lw in series:
+        cv.create_line(lx, 12, lx + 18, 12, fill=color, width=lw, dash=dash, tags=("pinned",))
+        cv.create_text(lx + 22, 12, text=label, anchor="w", font=("Arial", 8), fill=COLORS["hint_fg"],
+                       tags=("pinned",))
+        lx += 125
+
+    cv.configure(xscrollcommand=on_xscroll)
+    level_var.trace_add("write", set_level)
+    set_level()
+
+    total = n_days
     pct = int(round((done / total) * 100)) if total else 0
     tk.Label(win, text=f"Completion: {done}/{total} days ({pct}%)",
              bg=COLORS["main_bg"]).pack(anchor="w", padx=12)
@@ -1156,9 +1297,54 @@ def do_trend():
     # Ensure proper centering after layout
     win.update_idletasks()
     center_on_parent(win, left_wrap, y_bias=-80)
+    render_visible(force=True)      # the real canvas width is known now
 
 
 # -------- Calendar Month View --------
+CAL_CACHE_MONTHS = 24       # month layouts kept in the LRU below
+MONTH_CACHE = OrderedDict() # (habit, year, month) -> month_model() result, oldest first
+
+def month_model(habit, y, m):
+    """Cell model of one calendar month: first weekday, day count, mood per day and the
+    rollup totals. Served from a small LRU so ◀/▶ back and forth costs nothing."""
+    key = (habit, y, m)
+    hit = MONTH_CACHE.get(key)
+    if hit is not None:
+        MONTH_CACHE.move_to_end(key)
+        return hit
+    first_wd, days_in_month = calendar.monthrange(y, m)     # first_wd: Mon=0
+    by = habit_range(habit, date(y, m, 1), date(y, m, days_in_month))
+    # 本月汇总直接取自 rollup（不逐日扫描）; a habit deleted while the window is open has none
+    r = habit_rollups(habit)
+    if r is not None:
+        m_done, m_counts = r.get("month", f"{y}-{m:02d}")
+    else:
+        m_done, m_counts = habit_counts(habit, date(y, m, 1), date(y, m, days_in_month))
+    hit = MONTH_CACHE[key] = {
+        "first_wd": first_wd,
+        "days": days_in_month,
+        "moods": [by.get(date(y, m, d).isoformat()) for d in range(1, days_in_month + 1)],
+        "done": m_done,
+        "counts": m_counts,
+    }
+    if len(MONTH_CACHE) > CAL_CACHE_MONTHS:
+        MONTH_CACHE.popitem(last=False)
+    return hit
+
+def _shift_month(y, m, k):
+    """(year, month) `k` months after y-m."""
+    y, m = divmod(y * 12 + m - 1 + k, 12)
+    return y, m + 1
+
+def _on_change_month(name, o, old, new):
+    if name is None or o is None:
+        MONTH_CACHE.clear()
+        return
+    d = date.fromordinal(o)
+    MONTH_CACHE.pop((name, d.year, d.month), None)
+
+CHANGE_HOOKS.append(_on_change_month)
+
 def do_calendar():
     """Show a month calendar view for a habit, color by mood (Morandi palette)."""
     names = list_habits()
@@ -1194,6 +1380,8 @@ def do_calendar():
 
     month_lbl = tk.Label(header, text="", bg=COLORS["main_bg"], fg=COLORS["title_fg"], font=("Arial", 13, "bold"))
     month_lbl.pack(side="left", padx=10)
+    month_stats = tk.Label(header, text="", bg=COLORS["main_bg"], fg=COLORS["hint_fg"], font=("Arial", 10))
+    month_stats.pack(side="left")
 
     def prev_month():
         nonlocal cur_y, cur_m
@@ -1211,6 +1399,23 @@ def do_calendar():
             cur_m += 1
         redraw()
 
+    def jump_entry(step):
+        # 跳到上一条/下一条打卡所在的月份（按排序日期索引二分查找）
+        nonlocal cur_y, cur_m
+        h = get_habit(habit_var.get())
+        if h is None:
+            return      # deleted while the calendar is open
+        days = h["days"]
+        if step < 0:
+            d = days.prev_day(date(cur_y, cur_m, 1))
+        else:
+            d = days.next_day(date(cur_y, cur_m, calendar.monthrange(cur_y, cur_m)[1]))
+        if d is None:
+            notify_dialog("Calendar", f"No {'earlier' if step < 0 else 'later'} entries.", icon="💬")
+            return
+        cur_y, cur_m = d.year, d.month
+        redraw()
+
     def open_trend_for_current():
         # 将当前选择的习惯设为选中，再打开 Trend 自定义范围
         SELECTED["habit"] = habit_var.get()
@@ -1219,6 +1424,10 @@ def do_calendar():
     btn_trend = ttk.Button(header, text="Trend…", style="SmallGreen.TButton", command=open_trend_for_current)
     btn_trend.pack(side="right", padx=(0, 8))
 
+    btn_next_entry = tk.Button(header, text="⏭", command=lambda: jump_entry(1),
+                               bg=COLORS["btn_toolbar_bg"], fg=COLORS["btn_toolbar_fg"])
+    btn_next_entry.pack(side="right")
+
     btn_next = tk.Button(header, text="▶", command=next_month,
                          bg=COLORS["btn_toolbar_bg"], fg=COLORS["btn_toolbar_fg"])
     btn_next.pack(side="right")
@@ -1227,6 +1436,10 @@ def do_calendar():
                          bg=COLORS["btn_toolbar_bg"], fg=COLORS["btn_toolbar_fg"])
     btn_prev.pack(side="right")
 
+    btn_prev_entry = tk.Button(header, text="⏮", command=lambda: jump_entry(-1),
+                               bg=COLORS["btn_toolbar_bg"], fg=COLORS["btn_toolbar_fg"])
+    btn_prev_entry.pack(side="right")
+
     body = tk.Frame(win, bg=COLORS["main_bg"])
     body.pack(padx=12, pady=(0, 10))
 
@@ -1235,112 +1448,485 @@ def do_calendar():
                    highlightthickness=1, highlightbackground=COLORS["border"])
     cv.pack()
 
+    # Grid, headers and legend are created once; redraw() only re-colours and re-labels.
+    x0, y0 = 20, 40
+    cell_w = (cv_w - 40) // 7
+    cell_h = (cv_h - 70) // 6
+
     # weekday headers
     weekdays = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-    def draw_headers():
-        x0, y0 = 20, 20
-        cell_w = (cv_w - 40) // 7
-        for i, wd in enumerate(weekdays):
-            x = x0 + i * cell_w + cell_w // 2
-            cv.create_text(x, y0, text=wd, font=("Arial", 10, "bold"), fill=COLORS["title_fg"])
+    for i, wd in enumerate(weekdays):
+        x = x0 + i * cell_w + cell_w // 2
+        cv.create_text(x, 20, text=wd, font=("Arial", 10, "bold"), fill=COLORS["title_fg"], tags=("hdr",))
+
+    # 6×7 cells: (background, day number, mood glyph)
+    cells = []
+    icons = {}          # glyph item -> image shown (see set_mood_icon)
+    for k in range(42):
+        row, col = divmod(k, 7)
+        left = x0 + col * cell_w
+        top  = y0 + row * cell_h
+        right = left + cell_w - 6
+        bottom = top + cell_h - 6
+        cells.append((
+            cv.create_rectangle(left, top, right, bottom, outline=COLORS["border"], width=1, tags=("cell",)),
+            cv.create_text(left + 10, top + 12, anchor="w", font=("Arial", 10, "bold"),
+                           fill=COLORS["title_fg"], tags=("cell",)),
+            cv.create_image((left+right)//2, (top+bottom)//2 + 6, image=mood_glyph(None, 14), tags=("cell",)),
+        ))
+
+    # legend
+    lx, ly = 24, cv_h - 18
+    items = [("happy", "😊"), ("neutral", "😐"), ("tired", "😪"), ("stressed", "😰"), (None, "—")]
+    off = 0
+    for code, em in items:
+        cv.create_rectangle(lx + off, ly - 10, lx + off + 14, ly + 4, fill=MOOD_COLOR.get(code, MOOD_COLOR[None]),
+                            outline=COLORS["border"], tags=("legend",))
+        cv.create_text(lx + off + 22, ly - 3, text=f"{em} {code or 'none'}", anchor="w", font=("Arial", 9),
+                       fill=COLORS["hint_fg"], tags=("legend",))
+        off += 120
 
     def redraw():
-        cv.delete("all")
         # use the current value from the dropdown for both title and data source
         current_habit_name = habit_var.get()
         win.title(f"Calendar — {current_habit_name}")
         mon_name = calendar.month_name[cur_m]
         month_lbl.config(text=f"{mon_name} {cur_y}")
+        mm = month_model(current_habit_name, cur_y, cur_m)
+        month_stats.config(text=f"✓ {mm['done']}/{mm['days']}  " +
+                           "  ".join(f"{MOOD_ICON[k]} {mm['counts'][k]}" for k, _ in MOOD_OPTIONS))
+
+        # Mon=0..Sun=6 grid: day d sits in cell first_wd + d - 1
+        for k, (rect, num, emo) in enumerate(cells):
+            day = k - mm["first_wd"] + 1
+            if not 1 <= day <= mm["days"]:
+                for it in (rect, num, emo):
+                    cv.itemconfig(it, state="hidden")
+                continue
+            mood = mm["moods"][day - 1]
+            # cell background by mood
+            cv.itemconfig(rect, fill=MOOD_COLOR.get(mood, MOOD_COLOR[None]), state="normal")
+            cv.itemconfig(num, text=str(day), state="normal")
+            set_mood_icon(cv, emo, mood, 14, icons, state="normal")
+        schedule_prefetch()
+
+    # 空闲时预先算好前后两个月和下一个习惯的本月，翻页/切换时直接命中 MONTH_CACHE
+    prefetch = {"queue": [], "job": None}
+
+    def schedule_prefetch():
+        name = habit_var.get()
+        queue = [(name, *_shift_month(cur_y, cur_m, -1)), (name, *_shift_month(cur_y, cur_m, 1))]
+        if name in names and len(names) > 1:
+            queue.append((names[(names.index(name) + 1) % len(names)], cur_y, cur_m))
+        prefetch["queue"] = queue
+        if prefetch["job"] is None:
+            prefetch["job"] = root.after_idle(prefetch_one)
+
+    def prefetch_one():
+        # one month per idle slot, so input events get in between
+        prefetch["job"] = None
+        if not prefetch["queue"] or not win.winfo_exists():
+            return
+        name, y, m = prefetch["queue"].pop(0)
+        if name in DATA["habits"]:
+            month_model(name, y, m)
+        if prefetch["queue"]:
+            prefetch["job"] = root.after_idle(prefetch_one)
+
+    win.bind("<F11>", lambda _=None: notify_dialog("Redraw benchmark", bench_redraws({"calendar": redraw}),
+                                                    icon="⏱"))
+    redraw()
+    # Ensure proper centering after layout
+    win.update_idletasks()
+    center_on_parent(win, left_wrap, y_bias=-40)
 
-        draw_headers()
-        x0, y0 = 20, 40
-        cell_w = (cv_w - 40) // 7
-        cell_h = (cv_h - 70) // 6
-
-        sel_habit = get_habit(current_habit_name)
-        by = sel_habit["history"] if sel_habit else {}
-
-        first_wd, days_in_month = calendar.monthrange(cur_y, cur_m)  # first_wd: Mon=0
-        # Convert to our grid where Mon=0..Sun=6 already matches
-        day = 1
-        row = 0
-        col = first_wd
-        while day <= days_in_month:
-            d = date(cur_y, cur_m, day)
-            ds = d.isoformat()
-            mood = by.get(ds)
-
-            left = x0 + col * cell_w
-            top  = y0 + row * cell_h
-            right = left + cell_w - 6
-            bottom = top + cell_h - 6
+def do_year_overview():
+    """All habits × 12 months for one year, shaded by completion (from the rollups)."""
+    names = list_habits()
+    if not names:
+        notify_dialog("Year View", "No habits yet.", icon="💬")
+        return
+    cur_y = date.today().year
 
-            # cell background by mood
-            fill = MOOD_COLOR.get(mood, MOOD_COLOR[None])
-            cv.create_rectangle(left, top, right, bottom, fill=fill, outline=COLORS["border"], width=1)
-
-            # day number
-            cv.create_text(left + 10, top + 12, text=str(day), anchor="w", font=("Arial", 10, "bold"), fill=COLORS["title_fg"])
-            # emoji centered
-            cv.create_text((left+right)//2, (top+bottom)//2 + 6, text=MOOD_ICON.get(mood, "—"), font=("Arial", 14))
-
-            # advance grid
-            col += 1
-            if col == 7:
-                col = 0
-                row += 1
-            day += 1
-
-        # legend
-        lx, ly = 24, cv_h - 18
-        items = [("happy", "😊"), ("neutral", "😐"), ("tired", "😪"), ("stressed", "😰"), (None, "—")]
-        off = 0
-        for code, em in items:
-            cv.create_rectangle(lx + off, ly - 10, lx + off + 14, ly + 4, fill=MOOD_COLOR.get(code, MOOD_COLOR[None]), outline=COLORS["border"])
-            cv.create_text(lx + off + 22, ly - 3, text=f"{em} {code or 'none'}", anchor="w", font=("Arial", 9), fill=COLORS["hint_fg"])
-            off += 120
+    win = tk.Toplevel(root)
+    win.title("Year View")
+    win.configure(bg=COLORS["main_bg"])
+    win.resizable(False, False)
+    win.transient(root)
+    win.withdraw()
+
+    header = tk.Frame(win, bg=COLORS["main_bg"])
+    header.pack(fill="x", pady=(10, 6), padx=12)
+    year_lbl = tk.Label(header, text="", bg=COLORS["main_bg"], fg=COLORS["title_fg"], font=("Arial", 13, "bold"))
+    year_lbl.pack(side="left", padx=10)
+
+    def step_year(k):
+        nonlocal cur_y
+        cur_y += k
+        redraw()
+
+    tk.Button(header, text="▶", command=lambda: step_year(1),
+              bg=COLORS["btn_toolbar_bg"], fg=COLORS["btn_toolbar_fg"]).pack(side="right")
+    tk.Button(header, text="◀", command=lambda: step_year(-1),
+              bg=COLORS["btn_toolbar_bg"], fg=COLORS["btn_toolbar_fg"]).pack(side="right")
+
+    name_w, cell_w, cell_h, top = 130, 44, 30, 30
+    cv_w = name_w + cell_w * 13 + 20
+    cv_h = top + cell_h * len(names) + 16
+    cv = tk.Canvas(win, width=cv_w, height=cv_h, bg=COLORS["card_bg"],
+                   highlightthickness=1, highlightbackground=COLORS["border"])
+    cv.pack(padx=12, pady=(0, 12))
+
+    def shade(frac):
+        # 从空灰过渡到主题绿：完成率越高颜色越深
+        a = tuple(int(COLORS["dot_empty"][i:i + 2], 16) for i in (1, 3, 5))
+        b = tuple(int(MOOD_OUTLINE["happy"][i:i + 2], 16) for i in (1, 3, 5))
+        return "#%02x%02x%02x" % tuple(int(x + (y - x) * frac) for x, y in zip(a, b))
+
+    def redraw():
+        cv.delete("all")
+        year_lbl.config(text=str(cur_y))
+        for m in range(1, 13):
+            cv.create_text(name_w + (m - 1) * cell_w + cell_w // 2, top // 2,
+                           text=calendar.month_abbr[m], font=("Arial", 9, "bold"), fill=COLORS["title_fg"])
+        cv.create_text(name_w + 12 * cell_w + cell_w // 2, top // 2, text="Year",
+                       font=("Arial", 9, "bold"), fill=COLORS["title_fg"])
+        year_days = 366 if calendar.isleap(cur_y) else 365
+        for row, name in enumerate(names):
+            y = top + row * cell_h
+            cv.create_text(10, y + cell_h // 2, text=name, anchor="w", font=("Arial", 10), fill=COLORS["title_fg"])
+            r = habit_rollups(name)
+            if r is None:
+                # deleted while the window is open
+                cv.create_text(name_w + 6, y + cell_h // 2, text="(deleted)", anchor="w", font=("Arial", 9),
+                               fill=COLORS["hint_fg"])
+                continue
+            for m in range(1, 13):
+                done, _ = r.get("month", f"{cur_y}-{m:02d}")
+                x = name_w + (m - 1) * cell_w
+                cv.create_rectangle(x + 2, y + 2, x + cell_w - 2, y + cell_h - 2,
+                                    fill=shade(done / calendar.monthrange(cur_y, m)[1]), outline=COLORS["border"])
+                if done:
+                    cv.create_text(x + cell_w // 2, y + cell_h // 2, text=str(done), font=("Arial", 9),
+                                   fill=COLORS["title_fg"])
+            done, _ = r.get("year", str(cur_y))
+            x = name_w + 12 * cell_w
+            cv.create_text(x + cell_w // 2, y + cell_h // 2, text=f"{done}/{year_days}", font=("Arial", 9, "bold"),
+                           fill=COLORS["hint_fg"])
 
     redraw()
-    # Ensure proper centering after layout
+    win.update_idletasks()
+    center_on_parent(win, left_wrap, y_bias=-40)
+
+HEAT_SPANS = {"1 year": 1, "2 years": 2, "5 years": 5}
+HEAT_UNIT = 2               # screen px per raster unit (PhotoImage.zoom factor)
+HEAT_CELL, HEAT_GAP = 4, 1  # day square and gap, in raster units
+HEAT_BAND_GAP = 3           # extra units between stacked habits
+HEAT_OVERSCAN = 2           # habit bands rendered beyond the visible ones
+
+def _rgb(color):
+    return bytes.fromhex(color.lstrip("#"))
+
+def heat_band(name, s, e):
+    """Rasterize one habit's week-column × weekday-row heatmap for [s, e] (s a Monday)
+    into a PhotoImage: binary PPM bytes built per weekday row, then one zoom."""
+    weeks = (e - s).days // 7 + 1
+    n_days = (e - s).days + 1
+    bg = _rgb(COLORS["card_bg"])
+    # one day square plus its gap, per colour: empty grey, the mood colour when done
+    # (the darker grey outline for done without a known mood, so it differs from not done)
+    cell = {c: _rgb(c) * HEAT_CELL + bg * HEAT_GAP for c in set(MOOD_COLOR.values()) | {MOOD_OUTLINE[None]}}
+    cell[None] = bg * (HEAT_CELL + HEAT_GAP)     # past `e`
+    empty, done_grey = cell[MOOD_COLOR[None]], cell[MOOD_OUTLINE[None]]
+    days = [empty] * n_days + [cell[None]] * (weeks * 7 - n_days)
+    for d, m in get_habit(name)["days"].items(s, e):
+        c = MOOD_COLOR.get(m) if m else None
+        days[(d - s).days] = cell[c] if c else done_grey
+    width = weeks * (HEAT_CELL + HEAT_GAP)
+    gap_row = bg * width
+    rows = []
+    for wd in range(7):
+        rows += [b"".join(days[wd::7])] * HEAT_CELL + [gap_row] * HEAT_GAP
+    rows += [gap_row] * HEAT_BAND_GAP
+    head = b"P6 %d %d 255\n" % (width, len(rows))
+    return tk.PhotoImage(data=head + b"".join(rows), format="ppm").zoom(HEAT_UNIT)
+
+def do_heatmap():
+    """GitHub-style heatmap of daily moods, one habit or all habits stacked, over 1–5 years."""
+    names = list_habits()
+    if not names:
+        notify_dialog("Heatmap", "No habits yet.", icon="💬")
+        return
+
+    win = tk.Toplevel(root)
+    win.title("Heatmap")
+    win.configure(bg=COLORS["main_bg"])
+    win.resizable(False, False)
+    win.transient(root)
+    win.withdraw()
+
+    header = tk.Frame(win, bg=COLORS["main_bg"])
+    header.pack(fill="x", pady=(10, 6), padx=12)
+    tk.Label(header, text="Habit:", bg=COLORS["main_bg"]).pack(side="left")
+    habit_var = tk.StringVar(value=SELECTED.get("habit") or names[0])
+    tk.OptionMenu(header, habit_var, *(names + [ALL_HABITS])).pack(side="left", padx=(4, 10))
+    span_var = tk.StringVar(value="1 year")
+    tk.OptionMenu(header, span_var, *HEAT_SPANS).pack(side="left")
+    info_lbl = tk.Label(header, text="", bg=COLORS["main_bg"], fg=COLORS["hint_fg"], font=("Arial", 10))
+    info_lbl.pack(side="left", padx=10)
+
+    px = (HEAT_CELL + HEAT_GAP) * HEAT_UNIT          # screen px per week column / weekday row
+    band_px = (7 * (HEAT_CELL + HEAT_GAP) + HEAT_BAND_GAP) * HEAT_UNIT
+    name_w, top = 120, 20
+    view_w, view_h = 760, min(7 * band_px, len(names) * band_px) + top
+
+    body = tk.Frame(win, bg=COLORS["main_bg"])
+    body.pack(padx=12, pady=(0, 6))
+    # names stay put on the left; the image canvas scrolls both ways, names follow vertically
+    names_cv = tk.Canvas(body, width=name_w, height=view_h, bg=COLORS["card_bg"], highlightthickness=0)
+    names_cv.grid(row=0, column=0, sticky="ns")
+    cv = tk.Canvas(body, width=view_w, height=view_h, bg=COLORS["card_bg"],
+                   highlightthickness=1, highlightbackground=COLORS["border"])
+    cv.grid(row=0, column=1)
+    xbar = tk.Scrollbar(body, orient="horizontal", command=cv.xview)
+    xbar.grid(row=1, column=1, sticky="ew")
+
+    def yview(*args):
+        cv.yview(*args)
+        names_cv.yview(*args)
+    ybar = tk.Scrollbar(body, orient="vertical", command=yview)
+    ybar.grid(row=0, column=2, sticky="ns")
+
+    def yscroll(*args):
+        ybar.set(*args)
+        show_bands()
+    cv.configure(xscrollcommand=xbar.set, yscrollcommand=yscroll)
+
+    # legend
+    legend = tk.Frame(win, bg=COLORS["main_bg"])
+    legend.pack(fill="x", padx=12, pady=(0, 10))
+    for code, _ in MOOD_OPTIONS + [(None, "")]:
+        tk.Label(legend, text="  ", bg=MOOD_COLOR[code]).pack(side="left", padx=(8, 4))
+        tk.Label(legend, text=f"{MOOD_ICON.get(code, '—')} {code or 'none'}", bg=COLORS["main_bg"],
+                 fg=COLORS["hint_fg"], font=("Arial", 9)).pack(side="left")
+
+    # only the habit bands in view (plus HEAT_OVERSCAN) are rasterized; the dict keeps
+    # references to their images, or Tk drops them
+    state = {"shown": [], "span": None, "bands": {}}
+
+    def show_bands():
+        if state["span"] is None:
+            return
+        shown, (s, e), bands = state["shown"], state["span"], state["bands"]
+        y = cv.canvasy(0) - top
+        k0 = max(0, int(y // band_px) - HEAT_OVERSCAN)
+        k1 = min(len(shown), int((y + view_h) // band_px) + 1 + HEAT_OVERSCAN)
+        for k in [k for k in bands if not k0 <= k < k1]:     # scrolled away: free the image
+            cv.delete(bands.pop(k)[1])
+        for k in range(k0, k1):
+            # a habit deleted since redraw() keeps its slot but gets no band
+            if k not in bands and habit_shell(shown[k]):
+                img = heat_band(shown[k], s, e)
+                bands[k] = (img, cv.create_image(0, top + k * band_px, image=img, anchor="nw"))
+
+    def redraw(*_):
+        sel = habit_var.get()
+        # habits deleted while the window is open are left out
+        shown = [n for n in (names if sel == ALL_HABITS else [sel]) if habit_shell(n)]
+        e = date.today()
+        s = e - timedelta(days=365 * HEAT_SPANS[span_var.get()] - 1)
+        s -= timedelta(days=s.weekday())                # start on a Monday
+        t0 = time.perf_counter()
+        cv.delete("all")
+        names_cv.delete("all")
+        state.update(shown=shown, span=(s, e), bands={})
+        # month ticks along the top
+        d = date(s.year, s.month, 1)
+        while d <= e:
+            if d >= s:
+                cv.create_text((d - s).days // 7 * px, top // 2, text=calendar.month_abbr[d.month] +
+                               (f" {d.year}" if d.month == 1 else ""), anchor="w",
+                               font=("Arial", 8), fill=COLORS["hint_fg"])
+            d = date(d.year + d.month // 12, d.month % 12 + 1, 1)
+        for k, name in enumerate(shown):
+            names_cv.create_text(8, top + k * band_px + 7 * px // 2, text=name, anchor="w",
+                                 font=("Arial", 10), fill=COLORS["title_fg"])
+        w = ((e - s).days // 7 + 1) * px
+        h = top + max(1, len(shown)) * band_px
+        cv.configure(scrollregion=(0, 0, w, h))
+        names_cv.configure(scrollregion=(0, 0, name_w, h))
+        cv.xview_moveto(1.0)                            # most recent weeks in view
+        yview("moveto", 0)
+        show_bands()
+        info_lbl.config(text=f"{fmt_date_obj(s)} → {fmt_date_obj(e)} · "
+                             f"{len(shown)} habit{'s' if len(shown) != 1 else ''} · "
+                             f"{(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    habit_var.trace_add("write", redraw)
+    span_var.trace_add("write", redraw)
+    redraw()
+    win.update_idletasks()
+    center_on_parent(win, left_wrap, y_bias=-40)
+
+def do_insights():
+    """Cross-habit view: phi correlation of done days / a mood between every pair of habits."""
+    names = list_habits()
+    if len(names) < 2:
+        notify_dialog("Insights", "Add at least two habits first.", icon="💬")
+        return
+
+    win = tk.Toplevel(root)
+    win.title("Insights")
+    win.configure(bg=COLORS["main_bg"])
+    win.resizable(False, False)
+    win.transient(root)
+    win.withdraw()
+
+    header = tk.Frame(win, bg=COLORS["main_bg"])
+    header.pack(fill="x", pady=(10, 6), padx=12)
+    tk.Label(header, text="Last", bg=COLORS["main_bg"]).pack(side="left")
+    days_var = tk.StringVar(value="90")
+    tk.OptionMenu(header, days_var, "30", "90", "365").pack(side="left", padx=4)
+    tk.Label(header, text="days ·  compare:", bg=COLORS["main_bg"]).pack(side="left")
+    feat_var = tk.StringVar(value="done")
+    tk.OptionMenu(header, feat_var, *FEATURES).pack(side="left", padx=4)
+
+    name_w, cell = 120, 46
+    size = min(len(names), 14)          # keep the grid on screen; the list below covers the rest
+    cv_w = name_w + cell * size + 16
+    cv_h = name_w + cell * size + 16
+    cv = tk.Canvas(win, width=cv_w, height=cv_h, bg=COLORS["card_bg"],
+                   highlightthickness=1, highlightbackground=COLORS["border"])
+    cv.pack(padx=12)
+    notes = tk.Label(win, text="", justify="left", anchor="w", bg=COLORS["main_bg"],
+                     fg=COLORS["hint_fg"], font=("Arial", 10))
+    notes.pack(fill="x", padx=14, pady=(6, 12))
+
+    def mix(c1, c2, t):
+        a = [int(c1[i:i + 2], 16) for i in (1, 3, 5)]
+        b = [int(c2[i:i + 2], 16) for i in (1, 3, 5)]
+        return "#%02x%02x%02x" % tuple(int(x + (y - x) * t) for x, y in zip(a, b))
+
+    def redraw(*_):
+        cv.delete("all")
+        e = date.today()
+        m = co_matrix(e - timedelta(days=int(days_var.get()) - 1), e)
+        feat = feat_var.get()
+        shown = m.names[:size]
+        for i, n in enumerate(shown):
+            x = name_w + i * cell + cell // 2
+            cv.create_text(x, name_w - 6, text=n[:14], angle=60, anchor="w", font=("Arial", 9), fill=COLORS["title_fg"])
+            cv.create_text(name_w - 6, name_w + i * cell + cell // 2, text=n[:16], anchor="e",
+                           font=("Arial", 9), fill=COLORS["title_fg"])
+        for i, a in enumerate(shown):
+            for j, b in enumerate(shown):
+                r = m.phi(a, b, feat)
+                # 正相关偏绿、负相关偏紫，无数据为灰
+                if r is None:
+                    fill = MOOD_COLOR[None]
+                elif r >= 0:
+                    fill = mix(COLORS["card_bg"], MOOD_OUTLINE["happy"], min(1.0, r))
+                else:
+                    fill = mix(COLORS["card_bg"], MOOD_OUTLINE["stressed"], min(1.0, -r))
+                x, y = name_w + j * cell, name_w + i * cell
+                cv.create_rectangle(x + 1, y + 1, x + cell - 1, y + cell - 1, fill=fill, outline=COLORS["border"])
+                if r is not None and i != j:
+                    cv.create_text(x + cell // 2, y + cell // 2, text=f"{r:+.2f}", font=("Arial", 8),
+                                   fill=COLORS["title_fg"])
+        mood = feat if feat != "done" else "stressed"
+        lines = [f"When one habit is skipped vs done, how often another is {MOOD_ICON[mood]} {mood}:"]
+        for a, b, off, on in m.findings(mood, limit=6):
+            lines.append(f"  {a} skipped → {b} {mood} {off:.0%} of days  (vs {on:.0%} when done)")
+        if len(lines) == 1:
+            lines.append("  (not enough days yet)")
+        notes.config(text="\n".join(lines))
+
+    days_var.trace_add("write", redraw)
+    feat_var.trace_add("write", redraw)
+    redraw()
     win.update_idletasks()
     center_on_parent(win, left_wrap, y_bias=-40)
 
 def do_export():
-    """Export a text report file."""
-    habit, s, e = range_dialog("Export", default_days=7, allow_last=True, limit_days=None)
+    """Export a text report file (or a zip of all habits)."""
+    habit, s, e = range_dialog("Export", default_days=7, allow_last=True, limit_days=None,
+                               allow_all=True, pick_format=True)
     if not habit:
         return
-    h = get_habit(habit)
-    by = h["history"]
-    fname = f"report_{habit.replace(' ', '_')}_{fmt_date_obj(s)}_to_{fmt_date_obj(e)}.txt"
-    with open(fname, "w", encoding="utf-8") as f:
-        f.write(f"DailyFlow+ Report\nHabit: {habit}\nRange: {fmt_date_obj(s)} to {fmt_date_obj(e)}\n")
-        f.write("-" * 40 + "\n")
-        for d in daterange(s, e):
-            ds = d.isoformat()
-            m = by.get(ds)
-            f.write(f"{fmt_date_iso(ds)}: {MOOD_ICON.get(m, '—')} {m or '—'}\n")
+    fmt = EXPORT["fmt"]
+    if habit == ALL_HABITS:
+        # 在 GUI 进程内串行渲染：spawn 的子进程会重新导入 main.py 并建出整个 Tk 界面
+        fname = f"reports_{fmt_date_obj(s)}_to_{fmt_date_obj(e)}.zip"
+        st = export_bulk(None, [(s, e)], fname, workers=0, fmt=fmt)
+        notify_dialog("Exported", format_stats(st, fname), icon="📦")
+        return
+    fname = report_filename(habit, s, e, fmt)
+    write_lines(fname, export_lines(habit, s, e, fmt))
     notify_dialog("Exported", f"{fname}", icon="📄")
 
+IMPORT_POLL_MS = 100     # how often the UI checks whether the import thread is done
+
+def do_import():
+    """Import past days from a CSV / JSONL file (habit,date,mood,done)."""
+    path = filedialog.askopenfilename(
+        parent=root, title="Import history",
+        filetypes=[("CSV / JSONL", "*.csv *.jsonl *.ndjson"), ("All files", "*.*")])
+    if not path:
+        return
+
+    # parse and apply on a worker thread so the window keeps painting; the modal
+    # "Importing…" box holds the grab, so nothing else reads DATA until it is done
+    top = tk.Toplevel(root)
+    top.title("Import history")
+    top.configure(bg=COLORS["main_bg"])
+    top.resizable(False, False)
+    top.transient(root)
+    top.protocol("WM_DELETE_WINDOW", lambda: None)     # can't be closed half way
+    tk.Label(top, text=f"Importing {os.path.basename(path)}…", bg=COLORS["main_bg"],
+             fg=COLORS["title_fg"], font=("Arial", 12)).pack(padx=18, pady=(16, 8))
+    bar = ttk.Progressbar(top, mode="indeterminate", length=260)
+    bar.pack(padx=18, pady=(0, 16))
+    bar.start(15)
+    center_on_parent(top, left_wrap, y_bias=-60)
+    top.grab_set()
+
+    result = {}
+
+    def work():
+        try:
+            result["st"] = import_file(path)
+        except Exception as ex:     # shown on the UI side; a thread would just print it
+            result["err"] = ex
+
+    def finish():
+        if worker.is_alive():
+            root.after(IMPORT_POLL_MS, finish)
+            return
+        top.destroy()
+        if "err" in result:
+            error_dialog("Import failed", f"{result['err']}")
+            return
+        refresh_all()
+        notify_dialog("Imported", format_import_stats(result["st"], path), icon="📥")
+
+    worker = threading.Thread(target=work, name="import", daemon=True)
+    worker.start()
+    root.after(IMPORT_POLL_MS, finish)
+
 def delete_habit(name):
     """Delete a habit entry."""
     if confirm_delete_dialog(name):
-        DATA["habits"].pop(name, None)
-        # 清理与该习惯相关的 recent 记录
-        if "recent" in DATA:
-            DATA["recent"] = [r for r in DATA["recent"] if r.get("habit") != name]
-        save_data()
+        record_op({"op": "del", "h": name})
         if SELECTED["habit"] == name:
             SELECTED["habit"] = None
-        render_cards()
-        refresh_right_panel()
+        request_refresh()
 
 def mark_habit(name):
     """Set or clear today's mood for a habit.
     - If pick_mood_dialog returns a mood code: mark complete for today and log to recent.
     - If it returns None (Clear today): clear today's record, unset completion, and remove today's recent log for this habit.
     """
-    h = get_habit(name)
+    h = habit_shell(name)
     if not h:
         return
     mood = pick_mood_dialog(default=h.get("last"), title_text=f"Update Mood — {name}")
@@ -1349,149 +1935,175 @@ def mark_habit(name):
 
     # If user chose "Clear today": remove today's record and completion, log a "clear" event to recent
     if mood is None:
-        # 删除今天的心情
-        if t in h.get("history", {}):
-            try:
-                del h["history"][t]
-            except Exception:
-                h["history"].pop(t, None)  # 兜底
-        # 取消今日完成标记
-        if "done" in h and t in h["done"]:
-            h["done"].pop(t, None)
-        # 重新估算 last：用最近一次（早于今天）的记录，否则置空
-        prev_keys = [ds for ds in h.get("history", {}).keys() if ds < t]
-        if prev_keys:
-            prev_day = max(prev_keys)  # 字符串 ISO 日期可直接比较
-            h["last"] = h["history"].get(prev_day)
-        else:
-            h["last"] = None
-        # 从 recent 里移除“今天此习惯”的原有记录，并新增一条“Clear”记录
-        DATA.setdefault("recent", [])
-        DATA["recent"] = [
-            r for r in DATA["recent"]
-            if not (r.get("habit") == name and r.get("dt", "")[:10] == t)
-        ]
-        DATA["recent"].insert(0, {
-            "dt": datetime.now().isoformat(timespec="seconds"),
-            "habit": name,
-            "mood": "cleared"
-        })
-        save_data()
-        render_cards()
-        refresh_right_panel()
+        record_op({"op": "clear", "h": name, "d": t,
+                   "t": datetime.now().isoformat(timespec="seconds")})
+        update_card(name)
+        request_refresh("summary", "activity", "dots")
         return
 
     # 用户正常选择了心情：记录 + 完成 + recent
-    h.setdefault("history", {})[t] = mood
-    h["last"] = mood
-    h.setdefault("done", {})[t] = True   # 今日完成
-    push_recent(name, mood)  # 记录这一条最新行为（带时间）
-    save_data()
-    set_random_tip()  # 打卡后随机更换一条鼓励语
-    render_cards()
-    refresh_right_panel()
+    record_op({"op": "set", "h": name, "d": t, "m": mood,
+               "t": datetime.now().isoformat(timespec="seconds")})
+    update_card(name)
+    request_refresh("summary", "activity", "dots", "tip")  # 打卡后随机更换一条鼓励语
 
 # ------------- Cards rendering -------------
 
-def render_cards():
-    """Render habit cards."""
-    for w in cards_frame.winfo_children():
-        w.destroy()
-
-    names = list_habits()
-    if not names:
-        tk.Label(cards_frame, text="(no habits yet)", bg=COLORS["sidebar_bg"]).pack(pady=8)
-        refresh_right_panel()
+# Cards are virtualized: only rows intersecting the viewport (plus CARD_OVERSCAN)
+# have widgets. A card "slot" {"win", "row", "card", "title", "streak", "mood",
+# "name", "sig", "hl"} is one canvas window item; slots leaving the view go back
+# to CARD_POOL and are re-bound to whichever habit scrolls in next.
+CARDS = {}                  # habit name -> slot currently showing it
+CARD_POOL = []              # free slots, parked off-canvas
+CARD_ORDER = []             # list_habits() as of the last render_cards()
+CARD_SPAN = {"rows": None}  # (first, last) row range last materialized
+cards_empty = cards_canvas.create_text(0, 8, text="(no habits yet)", anchor="n",
+                                       fill=COLORS["title_fg"], state="hidden")
+
+def _card_state(name):
+    """(streak, today's mood or None) shown on a card."""
+    h = habit_shell(name)
+    today_d = date.today()
+    show_mood = h["days"].mood(today_d) if (h and is_done(h, today_d)) else None
+    return compute_streak(name), show_mood
+
+def _on_hover_in(event):
+    current = event.widget.cget("bg")
+    if current != "#FFF8FA":  # avoid redundant updates
+        event.widget.config(bg="#FFF8FA")
+
+def _on_hover_out(event):
+    event.widget.config(bg=COLORS["card_bg"])
+
+def _highlight(slot):
+    """Thick border on the selected habit's card; only reconfigures when it flips."""
+    hl = slot["name"] == SELECTED["habit"]
+    if hl != slot["hl"]:
+        slot["hl"] = hl
+        slot["card"].configure(highlightthickness=2 if hl else 1)
+
+def select_card(name):
+    """Select `name` and refresh the right panel."""
+    SELECTED["habit"] = name
+    for slot in CARDS.values():
+        _highlight(slot)
+    request_refresh("dots")
+
+def _make_slot():
+    """Build the widgets of one (unbound) card slot."""
+    # row container: fixed height so row i always sits at i * CARD_ROW_H
+    row = tk.Frame(cards_canvas, bg=COLORS["sidebar_bg"], height=CARD_ROW_H)
+    row.pack_propagate(False)
+
+    # the card panel
+    card = tk.Frame(
+        row,
+        bg=COLORS["card_bg"],
+        highlightthickness=1, highlightbackground=COLORS["card_border"]
+    )
+    card.pack(fill="both", expand=True, padx=22, pady=10, ipadx=10, ipady=8)
+
+    # Hover effect
+    card.bind("<Enter>", _on_hover_in)
+    card.bind("<Leave>", _on_hover_out)
+
+    # Make left info column stretch so the button column sticks to the right edge
+    card.grid_columnconfigure(0, weight=1)
+
+    # left info area
+    info = tk.Frame(card, bg=COLORS["card_bg"])
+    info.grid(row=0, column=0, sticky="w", padx=12, pady=6)
+
+    title = tk.Label(info, bg=COLORS["card_bg"], fg="#262626", font=("Arial", 16, "bold"))
+    title.pack(anchor="w")
+    streak_lbl = tk.Label(info, bg=COLORS["card_bg"], fg="#333", pady=2)
+    streak_lbl.pack(anchor="w")
+    mood_lbl = tk.Label(info, bg=COLORS["card_bg"], fg="#333", pady=2)
+    mood_lbl.pack(anchor="w")
+
+    # right buttons (inline)
+    btn_area = tk.Frame(card, bg=COLORS["card_bg"])
+    btn_area.grid(row=0, column=1, sticky="e", padx=12, pady=10)
+
+    slot = {"row": row, "card": card, "title": title, "streak": streak_lbl, "mood": mood_lbl,
+            "name": None, "sig": None, "hl": False}
+    # handlers look the habit up through the slot, so they follow re-binding
+    ttk.Button(
+        btn_area, text="Mark", style="CardGreen.TButton",
+        command=lambda: mark_habit(slot["name"])
+    ).pack(side="left", padx=(0, 8))
+
+    ttk.Button(
+        btn_area, text="🗑 Delete", style="CardGreen.TButton",
+        command=lambda: delete_habit(slot["name"])
+    ).pack(side="left")
+
+    # select highlight
+    card.bind("<Button-1>", lambda _=None: select_card(slot["name"]))
+    info.bind("<Button-1>", lambda _=None: select_card(slot["name"]))
+
+    slot["win"] = cards_canvas.create_window(0, -2 * CARD_ROW_H, window=row, anchor="nw",
+                                             width=cards_canvas.winfo_width(), height=CARD_ROW_H)
+    return slot
+
+def _bind_slot(name):
+    """Slot showing `name`: its current one, else a pooled (or new) slot re-labelled for it."""
+    slot = CARDS.get(name)
+    if slot is None:
+        slot = CARD_POOL.pop() if CARD_POOL else _make_slot()
+        slot["name"], slot["sig"] = name, None
+        slot["title"].config(text=name)
+        CARDS[name] = slot
+    return slot
+
+def _release_slot(name):
+    slot = CARDS.pop(name)
+    slot["name"] = None
+    cards_canvas.coords(slot["win"], 0, -2 * CARD_ROW_H)    # park above the scroll region
+    CARD_POOL.append(slot)
+
+def update_card(name):
+    """Refresh the streak and mood labels of one card; widgets are only touched if they changed."""
+    c = CARDS.get(name)
+    if c is None:
+        return      # not materialized: it is filled in when it scrolls into view
+    sig = _card_state(name)
+    if sig == c["sig"] and REDRAW_SKIP["on"]:
         return
+    c["sig"] = sig
+    streak, show_mood = sig
+    c["streak"].config(text=f"Streak: {streak} day{'s' if streak != 1 else ''}")
+    c["mood"].config(text=f"Current Mood: {MOOD_ICON.get(show_mood, '—')} {show_mood or '—'}")
+
+def render_visible_cards(force=False):
+    """Materialize the rows intersecting the viewport (± CARD_OVERSCAN), recycling the rest."""
+    n = len(CARD_ORDER)
+    top = cards_canvas.canvasy(0)
+    i0 = max(0, int(top // CARD_ROW_H) - CARD_OVERSCAN)
+    i1 = min(n, int((top + cards_canvas.winfo_height()) // CARD_ROW_H) + 1 + CARD_OVERSCAN)
+    if not force and CARD_SPAN["rows"] == (i0, i1):
+        return
+    CARD_SPAN["rows"] = (i0, i1)
+    keep = set(CARD_ORDER[i0:i1])
+    for name in [nm for nm in CARDS if nm not in keep]:
+        _release_slot(name)
+    for i in range(i0, i1):
+        name = CARD_ORDER[i]
+        slot = _bind_slot(name)
+        cards_canvas.coords(slot["win"], 0, i * CARD_ROW_H)
+        update_card(name)
+        _highlight(slot)
 
-    for name in names:
-        h = get_habit(name)
-        today_iso = today_str()
-        today_mood = h["history"].get(today_iso) if h else None
-        show_mood = today_mood if (h and is_done(h, today_iso)) else None
-        emoji = MOOD_ICON.get(show_mood, "—")
-        streak = compute_streak(name)
-
-        # row container
-        row = tk.Frame(cards_frame, bg=COLORS["sidebar_bg"])
-        row.pack(fill="x", padx=22, pady=10, anchor="nw")
-
-        # the card panel
-        card = tk.Frame(
-            row,
-            bg=COLORS["card_bg"],
-            highlightthickness=1, highlightbackground=COLORS["card_border"]
-        )
-        card.pack(fill="x", expand=True, ipadx=10, ipady=8)
-
-        # Hover effect
-        def on_hover_in(event):
-            current = event.widget.cget("bg")
-            if current != "#FFF8FA":  # avoid redundant updates
-                event.widget.config(bg="#FFF8FA")
-
-        def on_hover_out(event):
-            event.widget.config(bg=COLORS["card_bg"])
-
-        card.bind("<Enter>", on_hover_in)
-        card.bind("<Leave>", on_hover_out)
-
-        # Make left info column stretch so the button column sticks to the right edge
-        card.grid_columnconfigure(0, weight=1)
-
-        # left info area
-        info = tk.Frame(card, bg=COLORS["card_bg"])
-        info.grid(row=0, column=0, sticky="w", padx=12, pady=6)
-
-        tk.Label(info, text=name, bg=COLORS["card_bg"], fg="#262626",
-                 font=("Arial", 16, "bold")).pack(anchor="w")
-        tk.Label(info, text=f"Streak: {streak} day{'s' if streak != 1 else ''}",
-                 bg=COLORS["card_bg"], fg="#333", pady=2).pack(anchor="w")
-        tk.Label(info, text=f"Current Mood: {emoji} {show_mood or '—'}",
-                 bg=COLORS["card_bg"], fg="#333", pady=2).pack(anchor="w")
-
-        # right buttons (inline)
-        btn_area = tk.Frame(card, bg=COLORS["card_bg"])
-        btn_area.grid(row=0, column=1, sticky="e", padx=12, pady=10)
-
-        def on_mark(n=name):
-            # call mark for this habit
-            mark_habit(n)
-
-        def on_delete(n=name):
-            # delete this habit
-            delete_habit(n)
-
-        ttk.Button(
-            btn_area, text="Mark", style="CardGreen.TButton",
-            command=on_mark
-        ).pack(side="left", padx=(0, 8))
-
-        ttk.Button(
-            btn_area, text="🗑 Delete", style="CardGreen.TButton",
-            command=on_delete
-        ).pack(side="left")
-
-        # select highlight
-        def select_me(_=None, nm=name, cd=card):
-            SELECTED["habit"] = nm
-            for wrap in cards_frame.winfo_children():
-                if not wrap.winfo_children():
-                    continue
-                c = wrap.winfo_children()[0]
-                c.configure(highlightthickness=1)
-            cd.configure(highlightthickness=2)
-            refresh_right_panel()
-
-        card.bind("<Button-1>", select_me)
-        info.bind("<Button-1>", select_me)
-
+def render_cards():
+    """Sync the card list with list_habits(); only the visible rows are (re)bound.
+    Runs as the "cards" region of the refresh scheduler (see request_refresh)."""
+    names = list_habits()
+    CARD_ORDER[:] = names
     if SELECTED["habit"] is None and names:
         SELECTED["habit"] = names[0]
-        first_wrap = cards_frame.winfo_children()[0]
-        c = first_wrap.winfo_children()[0]
-        c.configure(highlightthickness=2)
-    refresh_right_panel()
+    cards_canvas.itemconfig(cards_empty, state="hidden" if names else "normal")
+    _update_scrollregion()
+    render_visible_cards(force=True)
 
 # ------------- Toolbar wiring -------------
 
@@ -1507,19 +2119,35 @@ def on_report():
 def on_export():
     do_export()
 
+def on_import():
+    do_import()
+
 
 def on_calendar():
     do_calendar()
 
+def on_year():
+    do_year_overview()
+
+def on_heatmap():
+    do_heatmap()
+
+def on_insights():
+    do_insights()
+
 make_toolbar_btn(toolbar, "Add Habit", on_add_habit)
 # make_toolbar_btn(toolbar, "View Mood Trend", on_trend)  # Removed per instructions
 make_toolbar_btn(toolbar, "Month View", on_calendar)
+make_toolbar_btn(toolbar, "Year View", on_year)
+make_toolbar_btn(toolbar, "Heatmap", on_heatmap)
+make_toolbar_btn(toolbar, "Insights", on_insights)
 make_toolbar_btn(toolbar, "Report", on_report)
 make_toolbar_btn(toolbar, "Export", on_export)
+make_toolbar_btn(toolbar, "Import", on_import)
 
 # ------------- Boot -------------
 
-DATA = load_data()
+init_data()
 
 def first_select_default():
     names = list_habits()
@@ -1528,8 +2156,19 @@ def first_select_default():
 
 def refresh_all():
     first_select_default()
-    render_cards()
-    refresh_right_panel()
+    request_refresh()
+
+def schedule_midnight_roll():
+    """Re-render just after local midnight so streaks and 'today' roll over."""
+    now = datetime.now()
+    nxt = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    root.after(int((nxt - now).total_seconds() * 1000) + 500, _on_midnight)
+
+def _on_midnight():
+    today_label.config(text=fmt_date_obj(date.today()))
+    refresh_all()
+    schedule_midnight_roll()
 
 refresh_all()
+schedule_midnight_roll()
 root.mainloop()     # 启动事件循环（显示窗口并响应交互）
@@ -0,0 +1,141 @@
+"""NumPy and pure-Python analytics must agree, on random histories and after marks."""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from dailyflow import analytics, core
+from dailyflow.model import MOOD_NAMES, new_habit
+
+numpy_only = pytest.mark.skipif(analytics.load_numpy() is None, reason="NumPy not installed")
+
+END = date(2025, 10, 15)
+MOODS = MOOD_NAMES + ["happy", "happy"]     # None (done, no mood) and a happy bias
+
+
+def _random_habit(rng, days):
+    h = new_habit()
+    rows = []
+    for k in range(days):
+        if rng.random() < 0.55:
+            rows.append((END - timedelta(days=k), rng.choice(MOODS), True))
+    h["days"].set_many(rows)
+    return h
+
+
+@pytest.fixture
+def habits(monkeypatch):
+    """Four random habits (one empty) in core.DATA, with the analytics caches reset."""
+    rng = random.Random(1234)
+    data = {f"H{i}": _random_habit(rng, n) for i, n in enumerate((400, 90, 1200))}
+    data["Empty"] = new_habit()
+    monkeypatch.setitem(core.DATA, "habits", data)
+    analytics._DENSE.clear()
+    analytics._CACHE["m"] = None
+    yield data
+    analytics._DENSE.clear()
+    analytics._CACHE["m"] = None
+
+
+def _mark(name, d, mood, done=True):
+    """What record_op does for a set/clear: change the day, then tell the hooks."""
+    days = core.DATA["habits"][name]["days"]
+    o = d.toordinal()
+    old = days.state(o)
+    if done:
+        days.set(d, mood)
+    else:
+        days.clear(d)
+    core.notify_change(name, o, old, days.state(o))
+
+
+# ------------- co-occurrence matrix -------------
+
+def _gram(m):
+    return [[int(x) for x in row] for row in m.g]
+
+@numpy_only
+@pytest.mark.parametrize("days,shift", [(1, 0), (30, 0), (400, 0), (3000, 0), (60, 1500)])
+def test_comatrix_numpy_matches_loops(habits, days, shift):
+    e = END - timedelta(days=shift)
+    s = e - timedelta(days=days - 1)
+    fast = analytics.CoMatrix(list(habits), s, e, use_numpy=True)
+    slow = analytics.CoMatrix(list(habits), s, e, use_numpy=False)
+    assert fast.numpy and not slow.numpy
+    assert _gram(fast) == _gram(slow)
+
+def test_comatrix_patch_matches_rebuild(habits):
+    rng = random.Random(7)
+    s = END - timedelta(days=89)
+    m = analytics.co_matrix(s, END)
+    for _ in range(200):
+        name = rng.choice(list(habits))
+        _mark(name, END - timedelta(days=rng.randint(0, 89)), rng.choice(MOODS), done=rng.random() < 0.7)
+    assert analytics.co_matrix(s, END) is m     # patched, not rebuilt
+    assert _gram(m) == _gram(analytics.CoMatrix(list(habits), s, END, use_numpy=False))
+
+# ------------- per-habit statistics -------------
+
+def _random_marks(rng, n):
+    for _ in range(n):
+        name = rng.choice(["H0", "H1", "H2", "Empty"])
+        # mostly inside the stored range (patched in place), some past its ends (rebuilt)
+        d = END - timedelta(days=rng.randint(-10, 1300))
+        _mark(name, d, rng.choice(MOODS), done=rng.random() < 0.7)
+
+def _stats(name, use_numpy):
+    """Every per-habit statistic for `name`, over a window wider than its history."""
+    s, e = END - timedelta(days=1400), END + timedelta(days=20)
+    out = {
+        "distribution": analytics.distribution(name, s, e, use_numpy),
+        "streak_histogram": analytics.streak_histogram(name, use_numpy),
+        "weekday_breakdown": analytics.weekday_breakdown(name, s, e, use_numpy),
+        "distribution/30": analytics.distribution(name, END - timedelta(days=29), END, use_numpy),
+    }
+    for w in (7, 30):
+        out[f"rolling_rate/{w}"] = analytics.rolling_rate(name, s, e, w, use_numpy)
+        out[f"rolling_rate/{w}/happy"] = analytics.rolling_rate(name, s, e, w, use_numpy, "happy")
+    return out
+
+def _brute(name):
+    """Reference values straight from the day states."""
+    days = core.DATA["habits"][name]["days"]
+    s, e = END - timedelta(days=1400), END + timedelta(days=20)
+    states = [days.state(o) for o in range(s.toordinal(), e.toordinal() + 1)]
+    done = sum(d for d, _ in states)
+    happy = [int(m == MOOD_NAMES.index("happy")) for _, m in states]
+    return done, happy
+
+@pytest.mark.parametrize("name", ["H0", "H1", "H2", "Empty"])
+def test_loops_match_brute_force(habits, name):
+    st = _stats(name, False)
+    done, happy = _brute(name)
+    assert st["distribution"]["done"] == done
+    assert sum(r["done"] for r in st["weekday_breakdown"]) == done
+    assert sum(n * c for n, c in st["streak_histogram"].items()) == len(core.DATA["habits"][name]["days"].marks)
+    # the last 7-day happy share is the plain count over the last 7 days
+    assert st["rolling_rate/7/happy"][-1] == pytest.approx(sum(happy[-7:]) / 7)
+
+@numpy_only
+@pytest.mark.parametrize("name", ["H0", "H1", "H2", "Empty"])
+def test_numpy_matches_loops(habits, name):
+    assert _stats(name, True) == _stats(name, False)
+
+@numpy_only
+def test_numpy_matches_loops_after_marks(habits):
+    rng = random.Random(99)
+    for name in habits:
+        _stats(name, True)              # fill the _DENSE cache first
+    patched = 0
+    for _ in range(5):
+        _random_marks(rng, 60)          # patches (or drops) the cached arrays
+        patched += len(analytics._DENSE)
+        for name in habits:
+            assert _stats(name, True) == _stats(name, False), name
+    assert patched                      # some arrays were patched in place, not only rebuilt
+
+def test_selfcheck_reports_no_mismatch(habits):
+    checks, bad = analytics.selfcheck(list(habits), END - timedelta(days=400), END)
+    assert checks == 7 * len(habits)
+    assert bad == []
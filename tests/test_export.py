@@ -0,0 +1,53 @@
+"""Bulk export file names."""
+
+import os
+import zipfile
+from datetime import date, timedelta
+
+import pytest
+
+from dailyflow import core
+from dailyflow.export import export_bulk
+from dailyflow.model import new_habit
+
+END = date(2025, 10, 15)
+NAMES = ["Read Book", "Read_Book", "read book", "Walk/Run"]
+
+
+@pytest.fixture
+def habits(monkeypatch):
+    data = {}
+    for n in NAMES:
+        h = data[n] = new_habit()
+        h["days"].set(END, "happy")
+    monkeypatch.setitem(core.DATA, "habits", data)
+    yield data
+    core.notify_change(None)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+@pytest.mark.parametrize("out", ["folder", "all.zip"])
+def test_clashing_names_get_their_own_files(habits, tmp_path, out, workers):
+    out = str(tmp_path / out)
+    st = export_bulk(NAMES, [(END - timedelta(days=6), END)], out, workers=workers, fmt="csv")
+    if out.endswith(".zip"):
+        with zipfile.ZipFile(out) as zf:
+            files = {n: zf.read(n).decode() for n in zf.namelist()}
+    else:
+        files = {}
+        for n in os.listdir(out):
+            with open(os.path.join(out, n), encoding="utf-8") as f:
+                files[n] = f.read()
+    assert st["files"] == len(files) == len(NAMES)
+    assert len({n.lower() for n in files}) == len(files)    # distinct on case-insensitive disks too
+    assert "report_Walk_Run_09-10-2025_to_15-10-2025.csv" in files
+    assert sorted(text.splitlines()[1].split(",")[0] for text in files.values()) == sorted(NAMES)
+
+
+def test_report_out_keeps_clashing_names_apart(habits, tmp_path, monkeypatch, capsys):
+    from dailyflow import cli
+    monkeypatch.setattr(core, "init_data", lambda backend=None: None)
+    out = str(tmp_path / "reports")
+    cli.main(["report", *NAMES, "--range", "7", "--out", out])
+    assert capsys.readouterr().out.startswith(f"{len(NAMES)} report(s) written")
+    assert len({n.lower() for n in os.listdir(out)}) == len(NAMES)
@@ -0,0 +1,45 @@
+"""Import row checks."""
+
+from datetime import date, timedelta
+
+import pytest
+
+from dailyflow import core
+from dailyflow.importer import import_rows
+
+
+@pytest.fixture
+def data(monkeypatch):
+    monkeypatch.setitem(core.DATA, "habits", {})
+    yield core.DATA
+    core.notify_change(None)
+
+
+def test_future_dates_are_rejected(data):
+    today = date.today()
+    rows = [(2, {"habit": "Read", "date": today.isoformat(), "mood": "happy"}),
+            (3, {"habit": "Read", "date": (today + timedelta(days=1)).isoformat(), "mood": "happy"})]
+    st = import_rows(rows, save=False)
+    assert (st["imported"], st["rejected"]) == (1, 1)
+    assert st["reasons"] == {"future date": 1}
+    assert st["samples"] == [(3, "future date")]
+    assert data["habits"]["Read"]["days"].last_day() == today
+
+
+def test_interleaved_multi_batch_import_reindexes(data):
+    today = date.today()
+    rows, n = [], 1
+    for k in range(9, -1, -1):             # date-major: every batch touches both habits
+        d = (today - timedelta(days=k)).isoformat()
+        for habit in ("Read", "Run"):
+            if habit == "Run" and k == 4:
+                continue                   # a gap in Run's history
+            n += 1
+            rows.append((n, {"habit": habit, "date": d, "mood": "happy"}))
+    st = import_rows(rows, batch_size=3, save=False)
+    assert st["imported"] == 19
+    read, run = data["habits"]["Read"]["days"], data["habits"]["Run"]["days"]
+    assert read.streak(today) == 10
+    assert run.streak(today) == 4 and run.longest_streak() == 5
+    assert len(read.marks) == 10 and len(run.marks) == 9
+    assert run.prev_day(today - timedelta(days=3)) == today - timedelta(days=5)
@@ -0,0 +1,152 @@
+"""HabitHistory and RecentLog incremental state against plain recomputation, and the SQLite streak."""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from dailyflow.model import (
+    MOOD_CODES, MOOD_NAMES, MOOD_OPTIONS, ROLLUP_LEVELS, HabitHistory, RecentLog, new_habit, period_keys,
+)
+from dailyflow.storage import SqliteStorage
+
+TODAY = date(2025, 10, 15)
+
+
+def _count_back(days, today):
+    n = 0
+    while days.is_done(today - timedelta(days=n)):
+        n += 1
+    return n
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_streak_counts_back_from_today(seed):
+    rng = random.Random(seed)
+    days = new_habit()["days"]
+    for _ in range(300):
+        d = TODAY + timedelta(days=rng.randint(-40, 10))
+        if rng.random() < 0.75:
+            days.set(d, rng.choice(["happy", None]))
+        else:
+            days.clear(d)
+        for k in range(-3, 4):
+            t = TODAY + timedelta(days=k)
+            n = _count_back(days, t)
+            assert days.streak(t) == n
+            assert days.streak_start(t) == (t - timedelta(days=n - 1) if n else None)
+
+
+def test_future_day_keeps_the_streak(tmp_path):
+    h = new_habit()
+    h["days"].set_many([(TODAY - timedelta(days=k), "happy", True) for k in range(3)]
+                       + [(TODAY + timedelta(days=5), "tired", True)])
+    assert h["days"].streak(TODAY) == 3
+    st = SqliteStorage(str(tmp_path / "habits.db"))
+    try:
+        st.write_all({"habits": {"Read": h}, "recent": RecentLog()})
+        assert st.streak("Read", TODAY) == 3
+    finally:
+        st.close()
+
+
+MOODS = [m for m, _ in MOOD_OPTIONS] + [None]
+
+
+def _random_ops(rng, days, n=200, span=60):
+    """Apply n random set/clear/set_many writes to `days`; yield the plain {day: (done, mood)} after each."""
+    plain = {}
+    for _ in range(n):
+        r = rng.random()
+        if r < 0.1:
+            rows = [(TODAY - timedelta(days=rng.randint(0, span)), rng.choice(MOODS), rng.random() < 0.8)
+                    for _ in range(rng.randint(1, 8))]
+            days.set_many(rows)
+            for d, m, done in rows:
+                plain[d] = (True, m) if done else (False, None)
+        elif r < 0.75:
+            d, m, done = TODAY - timedelta(days=rng.randint(0, span)), rng.choice(MOODS), rng.random() < 0.9
+            days.set(d, m, done)
+            plain[d] = (done, m)
+        else:
+            d = TODAY - timedelta(days=rng.randint(0, span))
+            days.clear(d)
+            plain.pop(d, None)
+        yield plain
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_prefix_counts_match_a_plain_count(seed):
+    rng = random.Random(seed)
+    days = new_habit()["days"]
+    days.counts(TODAY, TODAY)                       # build the sums first, so later writes patch them
+    for plain in _random_ops(rng, days):
+        s = TODAY - timedelta(days=rng.randint(-5, 70))
+        e = s + timedelta(days=rng.randint(0, 40))
+        inside = [v for d, v in plain.items() if s <= d <= e]
+        want = {m: sum(1 for _, mm in inside if mm == m) for m in MOODS if m}
+        assert days.counts(s, e) == (sum(1 for done, _ in inside if done), want)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_recent_log_matches_a_plain_list(seed):
+    rng = random.Random(seed)
+    log, plain = RecentLog(maxlen=10), []
+    habits = ["Read", "Run", "Walk"]
+    for i in range(400):
+        if rng.random() < 0.7:
+            dt = f"{TODAY - timedelta(days=rng.randint(0, 4))} {i:05d}"
+            entry = (dt, rng.choice(habits), rng.choice(MOODS))
+            log.push(*entry)
+            plain = [entry] + plain[:9]
+        else:
+            habit = rng.choice(habits)
+            day = rng.choice([None, str(TODAY - timedelta(days=rng.randint(0, 4)))])
+            log.discard(habit, day)
+            plain = [e for e in plain if not (e[1] == habit and (day is None or e[0][:10] == day))]
+        assert list(log) == plain and len(log) == len(plain)
+        indexed = sorted(tuple(e[:3]) for by_day in log.by_habit.values() for group in by_day.values() for e in group)
+        assert indexed == sorted(plain)
+    assert list(RecentLog.from_json(log.to_json(), maxlen=10)) == plain
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_marks_match_the_done_days(seed):
+    rng = random.Random(seed)
+    days = new_habit()["days"]
+    for plain in _random_ops(rng, days):
+        done = sorted(d for d, (is_done, _) in plain.items() if is_done)
+        assert [date.fromordinal(o) for o in days.marks] == done
+        assert (days.first_day(), days.last_day()) == ((done[0], done[-1]) if done else (None, None))
+        q = TODAY - timedelta(days=rng.randint(-3, 65))
+        before, after = [d for d in done if d < q], [d for d in done if d > q]
+        assert days.prev_day(q) == (before[-1] if before else None)
+        assert days.next_day(q) == (after[0] if after else None)
+        upto = [d for d in done if d <= q]
+        assert days.days_since_last(q) == ((q - upto[-1]).days if upto else None)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_rollups_match_a_plain_grouping(seed):
+    rng = random.Random(seed)
+    days = new_habit()["days"]
+    days.rollups()                                  # build first, so later writes patch the buckets
+    for plain in _random_ops(rng, days, span=400):
+        want = {lv: {} for lv in ROLLUP_LEVELS}
+        for d, (done, m) in plain.items():
+            for lv, key in zip(ROLLUP_LEVELS, period_keys(d)):
+                b = want[lv].setdefault(key, [0] * (len(MOOD_OPTIONS) + 1))
+                b[0] += done
+                if m:
+                    b[MOOD_CODES[m]] += 1
+        want = {lv: {k: b for k, b in buckets.items() if any(b)} for lv, buckets in want.items()}
+        assert days.rollups().to_json() == want
+
+
+def test_unknown_mood_loads_as_no_mood(capsys):
+    names = list(MOOD_NAMES)
+    days = HabitHistory.from_json({"2025-10-14": "ecstatic", "2025-10-15": "happy"},
+                                  {"2025-10-14": True, "2025-10-15": True})
+    assert list(days.items()) == [(date(2025, 10, 14), None), (date(2025, 10, 15), "happy")]
+    assert MOOD_NAMES == names                      # the shared code table is left alone
+    assert "'ecstatic'" in capsys.readouterr().out
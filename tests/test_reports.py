@@ -0,0 +1,28 @@
+"""Report summary lines."""
+
+from datetime import date, timedelta
+
+import pytest
+
+from dailyflow import core
+from dailyflow.model import new_habit
+from dailyflow.reports import report_summary
+
+
+@pytest.fixture
+def habit(monkeypatch):
+    h = new_habit()
+    monkeypatch.setitem(core.DATA, "habits", {"Read": h})
+    core.notify_change(None)
+    yield h
+    core.notify_change(None)
+
+
+def test_best_weekday_needs_a_completed_day(habit):
+    e = date.today()
+    s = e - timedelta(days=29)
+    assert not any(l.startswith("Best weekday") for l in report_summary("Read", s, e))
+    habit["days"].set(s, "happy")
+    core.notify_change(None)
+    best = [l for l in report_summary("Read", s, e) if l.startswith("Best weekday")]
+    assert best == [f"Best weekday: {s.strftime('%a')} (20% done)"]
@@ -0,0 +1,222 @@
+"""Storage: the SQLite backend and its migration, the habits.json journal and crash-safe snapshots."""
+
+import os
+from datetime import date, timedelta
+
+import pytest
+
+from dailyflow import core, storage
+from dailyflow.model import RecentLog, new_habit
+
+TODAY = date.today()
+
+
+def _day(k):
+    return (TODAY - timedelta(days=k)).isoformat()
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(storage.JOURNAL, "seq", 0)
+    return tmp_path
+
+
+@pytest.fixture
+def sqlite(workdir, monkeypatch):
+    st = storage.SqliteStorage()
+    monkeypatch.setattr(core, "STORAGE", st)
+    monkeypatch.setattr(core, "DATA", {"habits": {}, "recent": RecentLog()})
+    yield st
+    st.close()
+
+
+def _json_file(habits):
+    d = {"habits": {}, "recent": RecentLog()}
+    for name, days in habits.items():
+        h = d["habits"][name] = new_habit()
+        for k, mood in days:
+            h["days"].set(_day(k), mood)
+    storage.write_json_atomic(storage.DATA_FILE, storage.to_json_data(d))
+
+
+def test_record_set_clear_add_del(sqlite):
+    for op in ({"op": "add", "h": "Read", "d": _day(0), "m": None},
+               {"op": "set", "h": "Read", "d": _day(1), "m": "happy"},
+               {"op": "set", "h": "Run", "d": _day(0), "m": "tired"},
+               {"op": "clear", "h": "Read", "d": _day(0)}):
+        core.record_op(op)
+    assert sqlite.range("Read", TODAY - timedelta(days=5), TODAY) == {_day(1): "happy"}
+    assert sqlite.counts("Run", TODAY, TODAY) == (1, {"happy": 0, "neutral": 0, "tired": 1, "stressed": 0})
+    core.record_op({"op": "del", "h": "Run"})
+    sqlite.close()
+    d = storage.SqliteStorage().load()
+    assert list(d["habits"]) == ["Read"]
+    assert d["habits"]["Read"]["last"] == "happy"
+
+
+def test_partial_load_fills_on_demand(sqlite, monkeypatch):
+    monkeypatch.setattr(storage, "SQLITE_PRELOAD_DAYS", 3)
+    h = new_habit()
+    for k in (0, 1, 5, 40):
+        h["days"].set(_day(k), "neutral" if k == 40 else "happy")
+    sqlite.write_all({"habits": {"Read": h}, "recent": RecentLog()})
+    core.DATA.update(sqlite.load())
+    shell = core.habit_shell("Read")
+    assert shell["partial"]
+    assert shell["days"].first_day() == TODAY - timedelta(days=1)     # only the preload window
+    # partial habits answer ranges, counts and streaks from the database
+    s = TODAY - timedelta(days=60)
+    assert core.habit_counts("Read", s, TODAY) == (4, {"happy": 3, "neutral": 1, "tired": 0, "stressed": 0})
+    assert len(core.habit_range("Read", s, TODAY)) == 4
+    assert core.compute_streak("Read") == 2
+    full = core.get_habit("Read")
+    assert "partial" not in full
+    assert full["days"].first_day() == TODAY - timedelta(days=40)
+    assert full["days"].counts(s, TODAY)[0] == 4
+
+
+def test_migrate_json_to_sqlite(workdir):
+    _json_file({"Read": [(0, "happy"), (2, None)], "Run": [(1, "stressed")]})
+    assert storage.migrate_json_to_sqlite() == 3
+    assert not (workdir / "habits.db.tmp").exists()
+    st = storage.SqliteStorage()
+    try:
+        d = st.load()
+        assert sorted(d["habits"]) == ["Read", "Run"]
+        assert st.range("Read", TODAY - timedelta(days=5), TODAY) == {_day(0): "happy", _day(2): None}
+    finally:
+        st.close()
+
+
+def test_interrupted_migration_runs_again(workdir, monkeypatch):
+    _json_file({"Read": [(0, "happy")]})
+
+    def crash(self, d):
+        self._connect()
+        raise KeyboardInterrupt     # killed after the schema was created
+    with monkeypatch.context() as m:
+        m.setattr(storage.SqliteStorage, "write_all", crash)
+        with pytest.raises(KeyboardInterrupt):
+            storage.SqliteStorage().load()
+    assert not (workdir / "habits.db").exists()
+    st = storage.SqliteStorage()
+    try:
+        assert list(st.load()["habits"]) == ["Read"]
+    finally:
+        st.close()
+
+
+
+# ---- JSON snapshot + journal ----
+
+@pytest.fixture
+def journal(workdir, monkeypatch):
+    st = storage.JsonStorage()
+    st.saver._data = {"habits": {}, "recent": RecentLog()}
+    monkeypatch.setattr(core, "STORAGE", st)
+    monkeypatch.setattr(core, "DATA", st.saver._data)
+    return st
+
+
+def _mark(name, k, mood="happy"):
+    core.record_op({"op": "set", "h": name, "d": _day(k), "m": mood, "t": f"{_day(k)} 09:00"})
+
+
+def _days(d, name):
+    return {day.isoformat(): m for day, m in d["habits"][name]["days"].items()}
+
+
+def test_journal_replays_over_the_snapshot(journal, workdir):
+    _mark("Read", 2)
+    journal.saver._write()                  # snapshot at seq 1 folds the journal away
+    assert not (workdir / storage.JOURNAL_FILE).exists()
+    _mark("Read", 1, "tired")
+    _mark("Run", 0)
+    with open(storage.JOURNAL_FILE, "a", encoding="utf-8") as f:
+        f.write('{"op":"set","h":"Read","d":"%s","m":"stressed","seq":1}\n' % _day(5))  # already folded
+        f.write('{"op":"set","h":"Ru')                                              # torn by a crash
+    storage.JOURNAL["seq"] = 0
+    d = storage.load_json_data()
+    assert storage.JOURNAL["seq"] == 3
+    assert _days(d, "Read") == {_day(2): "happy", _day(1): "tired"}
+    assert _days(d, "Run") == {_day(0): "happy"}
+
+
+def test_crash_between_seal_and_snapshot_write(journal, workdir, monkeypatch):
+    _mark("Read", 3)
+    journal.saver._write()
+    _mark("Read", 2)
+
+    def crash(*a, **kw):
+        raise OSError("disk full")
+    with monkeypatch.context() as m:
+        m.setattr(storage, "write_json_atomic", crash)
+        with pytest.raises(OSError):
+            journal.saver._write()          # journal sealed, snapshot not written
+    assert (workdir / storage.JOURNAL_SEALED).exists()
+    _mark("Run", 0)                         # lands in a fresh live journal
+    want = {"Read": {_day(3): "happy", _day(2): "happy"}, "Run": {_day(0): "happy"}}
+    d = storage.load_json_data()
+    assert {n: _days(d, n) for n in d["habits"]} == want
+    journal.saver._write()                  # the next snapshot folds both segments
+    assert not (workdir / storage.JOURNAL_SEALED).exists()
+    assert not (workdir / storage.JOURNAL_FILE).exists()
+    d = storage.load_json_data()
+    assert {n: _days(d, n) for n in d["habits"]} == want
+
+
+def test_large_journal_requests_a_snapshot(journal, monkeypatch):
+    monkeypatch.setattr(storage, "JOURNAL_COMPACT_BYTES", 300)
+    asked = []
+    monkeypatch.setattr(journal.saver, "request", asked.append)
+    sizes = []
+    for k in range(6):
+        _mark("Read", k)
+        sizes.append(os.path.getsize(storage.JOURNAL_FILE))
+    assert len(asked) == sum(n > 300 for n in sizes) > 0
+
+
+# ---- crash-safe snapshots ----
+
+def _snap(names):
+    d = {"habits": {n: new_habit() for n in names}, "recent": RecentLog()}
+    return storage.to_json_data(d)
+
+
+def test_atomic_write_rotates_backups(workdir, monkeypatch):
+    monkeypatch.setattr(storage, "SAVE_BACKUPS", 2)
+    for k in range(4):
+        storage.write_json_atomic(storage.DATA_FILE, _snap([f"h{k}"]), backups=storage.SAVE_BACKUPS)
+    assert not (workdir / (storage.DATA_FILE + ".tmp")).exists()
+    newest_first = [storage.DATA_FILE, storage.DATA_FILE + ".1", storage.DATA_FILE + ".2"]
+    assert [list(storage._read_snapshot(p)["habits"]) for p in newest_first] == [["h3"], ["h2"], ["h1"]]
+    assert not (workdir / (storage.DATA_FILE + ".3")).exists()
+
+
+def test_failed_write_leaves_the_snapshot(workdir, monkeypatch):
+    storage.write_json_atomic(storage.DATA_FILE, _snap(["Read"]))
+    monkeypatch.setattr(storage.json, "dump", lambda *a, **kw: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        storage.write_json_atomic(storage.DATA_FILE, _snap(["Run"]))
+    assert list(storage._read_snapshot(storage.DATA_FILE)["habits"]) == ["Read"]
+
+
+def test_corrupt_snapshot_restores_the_backup_and_keeps_each_copy(workdir):
+    storage.write_json_atomic(storage.DATA_FILE, _snap(["Read"]), backups=3)
+    storage.write_json_atomic(storage.DATA_FILE, _snap(["Read", "Run"]), backups=3)
+    for _ in range(2):
+        (workdir / storage.DATA_FILE).write_text('{"habits": {', encoding="utf-8")
+        assert list(storage.load_json_data()["habits"]) == ["Read"]     # from habits.json.1
+    kept = sorted(p.name for p in workdir.glob(storage.DATA_FILE + ".corrupt*"))
+    assert len(kept) == 2
+
+
+def test_save_requests_coalesce_into_one_write(workdir):
+    saver = storage.SaveService(delay=0.2)
+    d = {"habits": {"Read": new_habit()}, "recent": RecentLog()}
+    for _ in range(5):
+        saver.request(d)
+    saver.flush()
+    assert (saver.requests, saver.writes) == (5, 1)
+    assert list(storage._read_snapshot(storage.DATA_FILE)["habits"]) == ["Read"]
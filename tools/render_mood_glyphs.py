@@ -0,0 +1,100 @@
+"""Render the mood icons (and the "—" placeholder) into assets/moods/*.png.
+
+main.py draws these PNGs with create_image instead of canvas emoji text. Tk 8.6
+loads PNG by itself, so only this script needs Pillow:
+
+    pip install pillow
+    python tools/render_mood_glyphs.py [font.ttf]
+
+Without an argument it tries FONT_CANDIDATES (DejaVu Sans and Segoe UI Symbol
+have monochrome faces for all four moods), then Pillow's default font. A font
+that lacks any of the icons is skipped; if none has them all, it exits with a
+message saying which fonts were tried.
+"""
+
+import os
+import sys
+
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from dailyflow.model import MOOD_ICON  # noqa: E402
+
+FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",     # Debian / Ubuntu
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",              # Fedora / Arch
+    "/Library/Fonts/DejaVuSans.ttf",                       # macOS, if installed
+    "C:/Windows/Fonts/seguisym.ttf",                       # Windows: Segoe UI Symbol
+    "DejaVuSans.ttf",                                      # anywhere on FreeType's search path
+)
+SIZES = (10, 12, 14)        # Tk point sizes the canvases used for the emoji text
+DPI = 96                    # Tk's usual screen resolution: px = pt * DPI / 72
+SUPERSAMPLE = 4
+INK = (0, 0, 0)             # canvas text's default fill
+OUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "assets", "moods")
+
+
+def _load(font_path, size):
+    """FreeType font at `size` px; font_path None = Pillow's default font (Pillow 10.1+)."""
+    if font_path is None:
+        return ImageFont.load_default(size=size)
+    return ImageFont.truetype(font_path, size)
+
+
+def _ink(font, text, size):
+    img = Image.new("L", (size * 2, size * 2))
+    ImageDraw.Draw(img).text((0, 0), text, font=font, fill=255)
+    return img.tobytes()
+
+
+def covers(font_path, texts):
+    """Does the font draw every one of `texts`, rather than a missing-glyph box or nothing?"""
+    size = 32
+    try:
+        font = _load(font_path, size)
+    except (OSError, TypeError):
+        return False
+    missing = _ink(font, "\U0010FFFD", size)      # a private-use code point no font has
+    for text in texts:
+        ink = _ink(font, text, size)
+        if ink == missing or not any(ink):
+            return False
+    return True
+
+
+def pick_font(argv, texts):
+    """The font named on the command line, else the first candidate that covers `texts`."""
+    tried = argv[1:] or list(FONT_CANDIDATES) + [None]
+    for path in tried:
+        if covers(path, texts):
+            return path
+    names = ", ".join(p or "Pillow default font" for p in tried)
+    sys.exit(f"render_mood_glyphs: no usable font (tried {names}); "
+             f"pass a .ttf that has {' '.join(texts)}")
+
+
+def render(text, pt, font_path):
+    """`text` centred on a transparent square of Tk's pixel size for `pt`."""
+    px = round(pt * DPI / 72)
+    big = px * SUPERSAMPLE
+    font = _load(font_path, big)
+    img = Image.new("RGBA", (big, big), INK + (0,))
+    draw = ImageDraw.Draw(img)
+    l, t, r, b = draw.textbbox((0, 0), text, font=font)
+    draw.text(((big - (r - l)) / 2 - l, (big - (b - t)) / 2 - t), text, font=font, fill=INK + (255,))
+    return img.resize((px, px), Image.LANCZOS)
+
+
+def main(argv):
+    glyphs = list(MOOD_ICON.items()) + [("none", "—")]
+    font_path = pick_font(argv, [text for _, text in glyphs])
+    os.makedirs(OUT, exist_ok=True)
+    for name, text in glyphs:
+        for pt in SIZES:
+            render(text, pt, font_path).save(os.path.join(OUT, f"{name}_{pt}.png"), optimize=True)
+    print(f"wrote {len(glyphs)} × {len(SIZES)} glyphs to {os.path.normpath(OUT)} "
+          f"({font_path or 'Pillow default font'})")
+
+
+if __name__ == "__main__":
+    main(sys.argv)